@@ -0,0 +1,91 @@
+import argparse
+import io
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import soundfile as sf
+
+from src.services.audio_decoder import RESAMPLE_QUALITIES, LibrosaDecoder, SoundFileDecoder
+
+SAMPLE_RATE = 16000
+
+
+def make_fixture(directory: Path, duration: float, native_rate: int = 44100, channels: int = 2) -> Path:
+    t = np.arange(int(duration * native_rate)) / native_rate
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    data = np.stack([tone] * channels, axis=1).astype(np.float32)
+    path = directory / f"fixture_{int(duration)}s_{native_rate}hz_{channels}ch.mp3"
+    sf.write(path, data, native_rate, format="MP3")
+    return path
+
+
+def time_call(func: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"mean_ms": statistics.mean(timings) * 1000, "min_ms": min(timings) * 1000}
+
+
+def benchmark_file(path: Path, repeats: int, segment_count: int, segment_duration: float) -> List[Dict[str, Any]]:
+    file_bytes = path.read_bytes()
+    results = []
+
+    def run(name: str, func: Callable[[io.BytesIO], Any]) -> None:
+        timing = time_call(lambda: func(io.BytesIO(file_bytes)), repeats)
+        results.append({"file": path.name, "case": name, **timing})
+
+    librosa_decoder = LibrosaDecoder(SAMPLE_RATE)
+    run("librosa full decode (baseline)", librosa_decoder.decode)
+
+    info = SoundFileDecoder(SAMPLE_RATE).probe(io.BytesIO(file_bytes))
+    run("soundfile header probe", SoundFileDecoder(SAMPLE_RATE).probe)
+
+    for quality in RESAMPLE_QUALITIES:
+        decoder = SoundFileDecoder(SAMPLE_RATE, quality)
+        run(f"soundfile full decode ({quality})", decoder.decode)
+
+    if info is not None and info.duration > segment_duration:
+        offsets = np.linspace(0, info.duration - segment_duration, num=segment_count).tolist()
+        for quality in ("LQ", "HQ"):
+            decoder = SoundFileDecoder(SAMPLE_RATE, quality)
+            run(
+                f"soundfile {segment_count}x{segment_duration:g}s segments ({quality})",
+                lambda f, d=decoder: [d.decode(f, offset=o, duration=segment_duration) for o in offsets]
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare audio decoder backends")
+    parser.add_argument("files", nargs="*", type=Path, help="Audio files to decode; synthetic MP3s are used if omitted")
+    parser.add_argument("--durations", type=float, nargs="+", default=[30.0, 180.0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--segment-count", type=int, default=3)
+    parser.add_argument("--segment-duration", type=float, default=10.0)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files or [make_fixture(Path(tmp), duration) for duration in args.durations]
+        results = []
+        for path in files:
+            results.extend(benchmark_file(path, args.repeats, args.segment_count, args.segment_duration))
+
+    width = max(len(result["case"]) for result in results)
+    for result in results:
+        print(f"{result['file']:<36} {result['case']:<{width}} {result['mean_ms']:>10.1f} ms  (min {result['min_ms']:.1f} ms)")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
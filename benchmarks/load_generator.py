@@ -0,0 +1,277 @@
+import argparse
+import json
+import mimetypes
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+DEFAULT_ENDPOINT = "/api/v1/classify"
+# A step counts as saturated when it completes less than this share of the offered rate.
+SATURATION_THROUGHPUT_RATIO = 0.9
+SATURATION_ERROR_RATE = 0.01
+
+
+class LogEntry:
+    """One request to replay: either a recorded raw body or an audio file sent as a multipart upload."""
+
+    def __init__(self, data: Dict[str, Any], base_dir: Path):
+        self.timestamp: Optional[float] = data.get("timestamp")
+        options = data.get("options") or {}
+        self.endpoint: str = options.get("endpoint", data.get("endpoint", DEFAULT_ENDPOINT))
+        self.query: str = options.get("query", data.get("query", ""))
+        self.content_type: Optional[str] = data.get("content_type")
+        self.body_path: Optional[Path] = base_dir / data["body"] if data.get("body") else None
+        self.file_path: Optional[Path] = Path(data["file"]) if data.get("file") else None
+        if self.body_path is None and self.file_path is None:
+            raise ValueError(f"Log entry needs 'file' or 'body': {data}")
+        if self.file_path is not None and not self.file_path.is_absolute():
+            self.file_path = base_dir / self.file_path
+        self._payload: Optional[bytes] = None
+
+    def load(self) -> None:
+        # Read everything up front so disk reads do not show up in the latencies.
+        self._payload = (self.body_path or self.file_path).read_bytes()
+
+    def send(self, session: requests.Session, base_url: str, timeout: float) -> requests.Response:
+        url = base_url.rstrip("/") + self.endpoint + (f"?{self.query}" if self.query else "")
+        if self.body_path is not None:
+            return session.post(url, data=self._payload, headers={"Content-Type": self.content_type}, timeout=timeout)
+        mime_type = mimetypes.guess_type(self.file_path.name)[0] or "application/octet-stream"
+        return session.post(url, files={"file": (self.file_path.name, self._payload, mime_type)}, timeout=timeout)
+
+
+def read_log(path: Path) -> List[LogEntry]:
+    with open(path, encoding="utf-8") as file:
+        entries = [LogEntry(json.loads(line), path.parent) for line in file if line.strip()]
+    if not entries:
+        raise SystemExit(f"No requests in {path}")
+    for entry in entries:
+        entry.load()
+    return entries
+
+
+def schedule(entries: List[LogEntry], count: int, speed: float, rps: Optional[float]) -> List[float]:
+    """Send offsets in seconds; entries are reused in order when count exceeds the log."""
+    if rps is not None:
+        return [index / rps for index in range(count)]
+
+    timestamps = [entry.timestamp for entry in entries]
+    if any(timestamp is None for timestamp in timestamps):
+        raise SystemExit("Replaying at the original rate needs a timestamp on every entry; use --rps instead")
+    offsets = [timestamp - timestamps[0] for timestamp in timestamps]
+    # Repeat the log back to back, keeping its average gap between the last and first request.
+    period = offsets[-1] + (offsets[-1] / max(1, len(offsets) - 1))
+    return [(offsets[index % len(offsets)] + period * (index // len(offsets))) / speed for index in range(count)]
+
+
+def run_step(entries: List[LogEntry], offsets: List[float], base_url: str, concurrency: int,
+             timeout: float) -> Dict[str, Any]:
+    """Open-loop replay: requests start at their scheduled time unless all connections are busy.
+
+    Latency is measured from the scheduled time, so waiting for a free connection counts against the
+    service instead of silently lowering the offered load.
+    """
+    latencies: List[float] = []
+    service_times: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    slots = threading.Semaphore(concurrency)
+    local = threading.local()
+
+    def send(entry: LogEntry, scheduled_at: float) -> None:
+        sent_at = time.perf_counter()
+        try:
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            status = str(entry.send(session, base_url, timeout).status_code)
+        except Exception as e:
+            # Connection errors and bad log rows alike are counted as errors, not lost with their slot.
+            status = type(e).__name__
+        finally:
+            slots.release()
+        finished_at = time.perf_counter()
+        with lock:
+            latencies.append(finished_at - scheduled_at)
+            service_times.append(finished_at - sent_at)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+        for index, offset in enumerate(offsets):
+            scheduled_at = start + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            slots.acquire()
+            pool.submit(send, entries[index % len(entries)], scheduled_at)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    # The span of n requests at a steady rate covers n - 1 gaps; add one so n / span is that rate.
+    offered_span = offsets[-1] * len(offsets) / (len(offsets) - 1) if len(offsets) > 1 else 0.0
+    return {
+        "requests": len(offsets),
+        "offered_rps": round(len(offsets) / offered_span, 3) if offered_span > 0 else None,
+        "achieved_rps": round(len(offsets) / elapsed, 3),
+        "seconds": round(elapsed, 3),
+        "errors": errors,
+        "error_rate": round(errors / len(offsets), 4),
+        "statuses": statuses,
+        "latency_ms": _percentiles(latencies),
+        "service_ms": _percentiles(service_times)
+    }
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    millis = np.asarray(values) * 1000
+    return {
+        "mean": round(float(millis.mean()), 3),
+        "p50": round(float(np.percentile(millis, 50)), 3),
+        "p95": round(float(np.percentile(millis, 95)), 3),
+        "p99": round(float(np.percentile(millis, 99)), 3),
+        "max": round(float(millis.max()), 3)
+    }
+
+
+def is_saturated(step: Dict[str, Any], slo_ms: Optional[float]) -> bool:
+    if step["offered_rps"] and step["achieved_rps"] < SATURATION_THROUGHPUT_RATIO * step["offered_rps"]:
+        return True
+    if step["error_rate"] > SATURATION_ERROR_RATE:
+        return True
+    return slo_ms is not None and step["latency_ms"]["p95"] > slo_ms
+
+
+def synthesize_log(directory: Path, count: int, rps: float) -> Path:
+    from benchmarks.pipeline_benchmark import make_fixture
+
+    fixtures_dir = directory / "fixtures"
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    fixtures = [
+        make_fixture(fixtures_dir, duration, audio_format, channels)
+        for duration in (10.0, 30.0) for audio_format in ("wav", "mp3") for channels in (1, 2)
+    ]
+    log_path = directory / "synthetic.jsonl"
+    with open(log_path, "w", encoding="utf-8") as file:
+        for index in range(count):
+            entry = {"timestamp": index / rps, "file": str(fixtures[index % len(fixtures)])}
+            file.write(json.dumps(entry) + "\n")
+    return log_path
+
+
+def start_standin_server(directory: Path, port: int, startup_timeout: float) -> subprocess.Popen:
+    from benchmarks.standin_models import build_standin_models
+
+    models = build_standin_models(directory / "standin_models")
+    env = dict(os.environ)
+    env.update({
+        "AUDIO_MODEL_NAME": models["audio"],
+        "TEXT_MODEL_NAME": models["text"],
+        "MODEL_CACHE_DIR": str(directory / "cache"),
+        "HF_HUB_OFFLINE": "1"
+    })
+    env.setdefault("DEVICE_MAP", "cpu")
+    # Replayed logs repeat files, so cached results and fingerprint matches would hide the model cost.
+    env.setdefault("RESULT_CACHE_ENABLED", "false")
+    env.setdefault("FINGERPRINT_ENABLED", "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Stand-in server exited with code {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health/ready", timeout=2).status_code == 200:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit(f"Stand-in server was not ready after {startup_timeout:.0f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a request log against the classify API")
+    parser.add_argument("log", nargs="?", type=Path,
+                        help="JSONL with 'file' or a recorded 'body' per line, plus 'timestamp' and optional 'options'")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay the original arrival times this many times faster")
+    parser.add_argument("--rps", type=float, nargs="+",
+                        help="Fixed request rates instead of the logged arrival times; several values run as steps")
+    parser.add_argument("--requests", type=int, help="Requests per step (default: one pass over the log)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--slo-ms", type=float, help="A step whose p95 latency exceeds this counts as saturated")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate a log of this many synthetic uploads")
+    parser.add_argument("--standin", action="store_true", help="Start a local server with stand-in models")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --standin")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--work-dir", type=Path, help="Keep stand-in models and synthetic fixtures here")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.log is None and not args.synthetic:
+        parser.error("pass a log file or --synthetic N")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        log_path = args.log or synthesize_log(work_dir, args.synthetic, (args.rps or [1.0])[0])
+        entries = read_log(log_path)
+
+        server = None
+        base_url = args.url
+        if args.standin:
+            server = start_standin_server(work_dir, args.port, args.startup_timeout)
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        steps = []
+        try:
+            for rps in args.rps or [None]:
+                count = args.requests or len(entries)
+                step = run_step(entries, schedule(entries, count, args.speed, rps), base_url,
+                                max(1, args.concurrency), args.timeout)
+                step["target_rps"] = rps
+                step["saturated"] = is_saturated(step, args.slo_ms)
+                steps.append(step)
+                print(
+                    f"rps {step['offered_rps'] or 0:>8.2f} -> {step['achieved_rps']:>8.2f}  "
+                    f"p50 {step['latency_ms']['p50']:>9.1f} ms  p95 {step['latency_ms']['p95']:>9.1f} ms  "
+                    f"p99 {step['latency_ms']['p99']:>9.1f} ms  errors {step['error_rate']:.1%}"
+                    f"{'  SATURATED' if step['saturated'] else ''}"
+                )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    sustained = [step["offered_rps"] for step in steps if not step["saturated"] and step["offered_rps"]]
+    saturated = [step["offered_rps"] for step in steps if step["saturated"] and step["offered_rps"]]
+    summary = {
+        "max_sustained_rps": max(sustained) if sustained else None,
+        "saturation_rps": min(saturated) if saturated else None
+    }
+    print(json.dumps(summary))
+    if args.json:
+        report = {
+            "meta": {"log": str(log_path), "url": base_url, "concurrency": args.concurrency, "speed": args.speed},
+            "steps": steps,
+            "summary": summary
+        }
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.standin_models import build_standin_models
+
+DEFAULT_AUDIO_MODEL = "dima806/music_genres_classification"
+DEFAULT_TEXT_MODEL = "google/flan-t5-large"
+# The formats the classify endpoint accepts by default.
+FORMATS = {"wav": "WAV", "mp3": "MP3"}
+MIME_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg"}
+
+
+def make_fixture(directory: Path, duration: float, audio_format: str, channels: int, native_rate: int = 44100) -> Path:
+    rng = np.random.default_rng(int(duration * 100) + channels)
+    t = np.arange(int(duration * native_rate)) / native_rate
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(len(t))
+    data = np.stack([tone] * channels, axis=1).astype(np.float32)
+    path = directory / f"fixture_{duration:g}s_{channels}ch.{audio_format}"
+    sf.write(path, data, native_rate, format=FORMATS[audio_format])
+    return path
+
+
+def time_call(func: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "repeats": repeats,
+        "mean_ms": statistics.mean(timings),
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        "min_ms": timings[0],
+        "max_ms": timings[-1]
+    }
+
+
+def is_cached(model_name: str, cache_dir: str) -> bool:
+    if Path(model_name).is_dir():
+        return True
+    from huggingface_hub import try_to_load_from_cache
+
+    return isinstance(try_to_load_from_cache(model_name, "config.json", cache_dir=cache_dir), str)
+
+
+def resolve_models(mode: str, cache_dir: str, work_dir: Path) -> Dict[str, str]:
+    audio_model = os.environ.get("AUDIO_MODEL_NAME", DEFAULT_AUDIO_MODEL)
+    text_model = os.environ.get("TEXT_MODEL_NAME", DEFAULT_TEXT_MODEL)
+    real_available = is_cached(audio_model, cache_dir) and is_cached(text_model, cache_dir)
+
+    if mode == "real" and not real_available:
+        raise SystemExit(f"Real models are not cached in {cache_dir}; run the server once or use --models standin")
+    if mode == "real" or (mode == "auto" and real_available):
+        return {"kind": "real", "audio": audio_model, "text": text_model, "cache_dir": cache_dir}
+
+    standin = build_standin_models(work_dir / "standin_models")
+    return {"kind": "standin", "audio": standin["audio"], "text": standin["text"], "cache_dir": str(work_dir / "cache")}
+
+
+def configure_environment(models: Dict[str, str]) -> None:
+    # src.config reads the environment on import, so this has to run before any src module is loaded.
+    os.environ.update({
+        "AUDIO_MODEL_NAME": models["audio"],
+        "TEXT_MODEL_NAME": models["text"],
+        "MODEL_CACHE_DIR": models["cache_dir"],
+        "HF_HUB_OFFLINE": "1",
+        "RESULT_CACHE_ENABLED": "false",
+        "FINGERPRINT_ENABLED": "false",
+        "RECOMMENDATION_POOL_ENABLED": "false",
+        "JOB_QUEUE_ENABLED": "false"
+    })
+    os.environ.setdefault("DEVICE_MAP", "cpu")
+
+
+def benchmark_fixture(path: Path, service: Any, client: Any, repeats: int) -> List[Dict[str, Any]]:
+    from src.schemas.request import AudioUpload
+
+    file_bytes = path.read_bytes()
+    audio_format = path.suffix.lstrip(".")
+    processor = service.audio_processor
+    upload = AudioUpload.from_bytes(file_bytes, path.name)
+    audio_dict, metadata = processor.process_audio_file(upload)
+
+    stages: Dict[str, Callable[[], Any]] = {
+        "ingest": lambda: AudioUpload.from_bytes(file_bytes, path.name),
+        "probe": lambda: processor.decoder.probe(io.BytesIO(file_bytes)),
+        "decode": lambda: processor.process_audio_file(upload),
+        "classify": lambda: service.classify_decoded(audio_dict),
+        "end_to_end": lambda: _post_classify(client, path.name, file_bytes, MIME_TYPES[audio_format])
+    }
+    fixture = {
+        "fixture": path.name,
+        "format": audio_format,
+        "duration": metadata.duration,
+        "channels": sf.info(io.BytesIO(file_bytes)).channels,
+        "size_bytes": len(file_bytes)
+    }
+    return [{**fixture, "stage": stage, **time_call(func, repeats)} for stage, func in stages.items()]
+
+
+def _post_classify(client: Any, filename: str, file_bytes: bytes, mime_type: str) -> None:
+    response = client.post("/api/v1/classify", files={"file": (filename, file_bytes, mime_type)})
+    if response.status_code != 200:
+        raise RuntimeError(f"Classify request failed with {response.status_code}: {response.text}")
+
+
+def run(fixtures: List[Path], repeats: int, generate_repeats: int) -> List[Dict[str, Any]]:
+    from fastapi.testclient import TestClient
+
+    from src.main import app
+    from src.services.service_loader import get_service_loader
+
+    results = []
+    with TestClient(app) as client:
+        loader = get_service_loader()
+        while not loader.is_ready():
+            if loader.has_failed():
+                raise SystemExit(f"Model loading failed: {loader.get_status()}")
+            time.sleep(0.1)
+        service = loader.get_service()
+
+        for path in fixtures:
+            results.extend(benchmark_fixture(path, service, client, repeats))
+        if generate_repeats > 0:
+            results.append({"fixture": None, "stage": "generate", **time_call(lambda: service.recommend("rock"), generate_repeats)})
+    return results
+
+
+def collect_metadata(models: Dict[str, str]) -> Dict[str, Any]:
+    import torch
+    import transformers
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "models": models["kind"],
+        "audio_model": models["audio"],
+        "text_model": models["text"],
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads()
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path) -> None:
+    baseline = {
+        (row["fixture"], row["stage"]): row["median_ms"]
+        for row in json.loads(baseline_path.read_text())["results"]
+    }
+    print(f"\nChange in median vs {baseline_path}:")
+    for row in results:
+        before = baseline.get((row["fixture"], row["stage"]))
+        if before:
+            change = (row["median_ms"] - before) / before
+            print(f"{row['fixture'] or '-':<28} {row['stage']:<11} {before:>10.1f} -> {row['median_ms']:>10.1f} ms  {change:+.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time each pipeline stage and the classify endpoint end to end")
+    parser.add_argument("--models", choices=("auto", "standin", "real"), default="auto",
+                        help="auto uses the real models when they are cached and tiny stand-ins otherwise")
+    parser.add_argument("--durations", type=float, nargs="+", default=[10.0, 60.0, 240.0])
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=["wav", "mp3"])
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--generate-repeats", type=int, default=3, help="0 skips the text model stage")
+    parser.add_argument("--work-dir", type=Path, help="Keep fixtures and stand-in models here between runs")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    parser.add_argument("--compare", type=Path, help="Earlier --json output to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or Path(tmp)
+        fixtures_dir = work_dir / "fixtures"
+        fixtures_dir.mkdir(parents=True, exist_ok=True)
+
+        models = resolve_models(args.models, os.environ.get("MODEL_CACHE_DIR", "./model_cache"), work_dir)
+        configure_environment(models)
+        fixtures = [
+            make_fixture(fixtures_dir, duration, audio_format, channels)
+            for duration in args.durations
+            for audio_format in args.formats
+            for channels in args.channels
+        ]
+        results = run(fixtures, args.repeats, args.generate_repeats)
+        report = {"meta": collect_metadata(models), "results": results}
+
+    for row in results:
+        print(
+            f"{row['fixture'] or '-':<28} {row['stage']:<11} median {row['median_ms']:>10.1f} ms  "
+            f"p95 {row['p95_ms']:>10.1f} ms"
+        )
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
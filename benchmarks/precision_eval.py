@@ -0,0 +1,153 @@
+import argparse
+import gc
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import psutil
+import torch
+
+from src.config import get_config
+from src.schemas.request import AudioUpload
+from src.services.classification_service import AudioProcessor, ModelManager
+from src.services.dynamic_recommendation_service import DynamicRecommendationService
+from src.services.model_precision import PRECISIONS
+
+config = get_config()
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
+
+
+def state_dict_megabytes(model: torch.nn.Module) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def rss_megabytes() -> float:
+    gc.collect()
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def load_clips(clips_dir: Path) -> List[Dict[str, Any]]:
+    processor = AudioProcessor()
+    clips = []
+    for path in sorted(clips_dir.iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        audio_dict, _ = processor.process_audio_file(AudioUpload.from_bytes(path.read_bytes(), path.name))
+        segments = audio_dict.get("segments") or [audio_dict["raw"]]
+        clips.append({
+            "name": path.name,
+            "inputs": [{"raw": segment, "sampling_rate": audio_dict["sampling_rate"]} for segment in segments]
+        })
+    return clips
+
+
+def evaluate_audio(precision: str, clips: List[Dict[str, Any]], repeats: int) -> Dict[str, Any]:
+    rss_before = rss_megabytes()
+    start = time.perf_counter()
+    manager = ModelManager({**config.get_audio_model_config(), "precision": precision})
+    load_seconds = time.perf_counter() - start
+    classifier = manager.get_classifier()
+
+    labels = {}
+    timings = []
+    for clip in clips:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = classifier([dict(item) for item in clip["inputs"]], batch_size=len(clip["inputs"]))
+            timings.append(time.perf_counter() - start)
+        # Each clip is labelled by the highest summed score over its segments.
+        scores: Dict[str, float] = {}
+        for segment_results in results:
+            for result in segment_results:
+                scores[result["label"]] = scores.get(result["label"], 0.0) + result["score"]
+        labels[clip["name"]] = max(scores, key=scores.get)
+
+    report = {
+        "model": "audio",
+        "precision": precision,
+        "load_seconds": load_seconds,
+        "weights_mb": state_dict_megabytes(classifier.model),
+        "rss_delta_mb": rss_megabytes() - rss_before,
+        "mean_latency_ms": statistics.mean(timings) * 1000 if timings else None,
+        "labels": labels
+    }
+    del classifier, manager
+    return report
+
+
+def evaluate_text(precision: str, repeats: int, max_new_tokens: int) -> Optional[Dict[str, Any]]:
+    rss_before = rss_megabytes()
+    start = time.perf_counter()
+    service = DynamicRecommendationService({**config.get_text_model_config(), "precision": precision})
+    load_seconds = time.perf_counter() - start
+    if not service.is_available():
+        return None
+
+    input_ids = service.tokenizer(service._build_prompt("rock"), return_tensors="pt").input_ids
+    timings = []
+    outputs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        generated = service.model.generate(input_ids, max_new_tokens=max_new_tokens, do_sample=False)
+        timings.append(time.perf_counter() - start)
+        outputs.append(service.tokenizer.decode(generated[0], skip_special_tokens=True))
+
+    report = {
+        "model": "text",
+        "precision": precision,
+        "load_seconds": load_seconds,
+        "weights_mb": state_dict_megabytes(service.model),
+        "rss_delta_mb": rss_megabytes() - rss_before,
+        "mean_latency_ms": statistics.mean(timings) * 1000,
+        "sample_output": outputs[0]
+    }
+    del service
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare model precisions on local audio clips")
+    parser.add_argument("clips_dir", type=Path, help="Directory with audio clips")
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--text", action="store_true", help="Also evaluate the text model")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clips_dir)
+    if not clips:
+        raise SystemExit(f"No audio clips found in {args.clips_dir}")
+
+    reports = [evaluate_audio(precision, clips, args.repeats) for precision in args.precisions]
+    reference = next((report["labels"] for report in reports if report["precision"] == "fp32"), reports[0]["labels"])
+    for report in reports:
+        agreeing = sum(report["labels"][name] == label for name, label in reference.items())
+        report["label_agreement"] = agreeing / len(reference)
+
+    if args.text:
+        reports.extend(
+            report for report in (evaluate_text(precision, args.repeats, args.max_new_tokens) for precision in args.precisions)
+            if report is not None
+        )
+
+    print(f"{'model':<6} {'precision':<9} {'load s':>7} {'weights MB':>11} {'RSS +MB':>8} {'latency ms':>11} {'agreement':>10}")
+    for report in reports:
+        agreement = f"{report['label_agreement']:.1%}" if "label_agreement" in report else "-"
+        print(
+            f"{report['model']:<6} {report['precision']:<9} {report['load_seconds']:>7.1f} {report['weights_mb']:>11.1f} "
+            f"{report['rss_delta_mb']:>8.1f} {report['mean_latency_ms']:>11.1f} {agreement:>10}"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+from pathlib import Path
+from typing import Dict
+
+import sentencepiece as spm
+import torch
+from transformers import (
+    T5Config,
+    T5ForConditionalGeneration,
+    T5Tokenizer,
+    Wav2Vec2Config,
+    Wav2Vec2FeatureExtractor,
+    Wav2Vec2ForSequenceClassification
+)
+
+GENRES = ("rock", "pop", "hip-hop", "classical", "jazz", "electronic")
+
+# Enough text for sentencepiece to cover the characters used in the recommendation prompts.
+_TOKENIZER_CORPUS = (
+    "Please suggest 2-3 similar bands or songs in the rock genre in bullet points.",
+    "Please recommend popular artists in the pop genre in bullet points.",
+    "Please suggest popular playlists or artists in the hip-hop genre in bullet points.",
+    "Please share an interesting fact about a composer or a piece in classical music.",
+    "Please suggest a relaxing evening playlist in the jazz genre in bullet points.",
+    "Please recommend famous music festivals or top DJs in the electronic music genre in bullet points.",
+    "Led Zeppelin, Queen and The Beatles. Miles Davis, John Coltrane. Daft Punk, Tomorrowland festival.",
+)
+_TOKENIZER_VOCAB_SIZE = 64
+
+
+def build_audio_model(directory: Path) -> Path:
+    """A two-layer Wav2Vec2 classifier with the same labels and preprocessing as the real model."""
+    if (directory / "config.json").exists():
+        return directory
+
+    torch.manual_seed(0)
+    model_config = Wav2Vec2Config(
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        conv_dim=(32,) * 7,
+        num_conv_pos_embeddings=16,
+        classifier_proj_size=16,
+        num_labels=len(GENRES),
+        id2label=dict(enumerate(GENRES)),
+        label2id={genre: index for index, genre in enumerate(GENRES)}
+    )
+    Wav2Vec2ForSequenceClassification(model_config).save_pretrained(directory)
+    Wav2Vec2FeatureExtractor(sampling_rate=16000).save_pretrained(directory)
+    return directory
+
+
+def build_text_model(directory: Path) -> Path:
+    """A two-layer T5 with a small trained sentencepiece vocabulary."""
+    if (directory / "config.json").exists():
+        return directory
+
+    directory.mkdir(parents=True, exist_ok=True)
+    corpus = directory / "corpus.txt"
+    corpus.write_text("\n".join(_TOKENIZER_CORPUS * 20))
+    spm.SentencePieceTrainer.train(
+        input=str(corpus),
+        model_prefix=str(directory / "spiece"),
+        vocab_size=_TOKENIZER_VOCAB_SIZE,
+        pad_id=0,
+        eos_id=1,
+        unk_id=2,
+        bos_id=-1,
+        hard_vocab_limit=False,
+        minloglevel=2
+    )
+    tokenizer = T5Tokenizer(str(directory / "spiece.model"), extra_ids=0)
+    tokenizer.save_pretrained(directory)
+
+    torch.manual_seed(0)
+    model_config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=32,
+        d_ff=64,
+        d_kv=16,
+        num_layers=2,
+        num_heads=2,
+        decoder_start_token_id=tokenizer.pad_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
+    T5ForConditionalGeneration(model_config).save_pretrained(directory)
+    for leftover in ("corpus.txt", "spiece.vocab"):
+        (directory / leftover).unlink(missing_ok=True)
+    return directory
+
+
+def build_standin_models(directory: Path) -> Dict[str, str]:
+    return {
+        "audio": str(build_audio_model(directory / "audio")),
+        "text": str(build_text_model(directory / "text"))
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create tiny randomly initialized stand-ins for the service models")
+    parser.add_argument("directory", type=Path)
+    args = parser.parse_args()
+
+    models = build_standin_models(args.directory)
+    print(f"AUDIO_MODEL_NAME={models['audio']}")
+    print(f"TEXT_MODEL_NAME={models['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.config import get_logger
+from src.services.metrics import ERRORS_TOTAL, REQUEST_SECONDS
+from src.services.overload_control import (
+    DEADLINE_HEADER,
+    get_overload_controller,
+    reset_current_deadline,
+    set_current_deadline
+)
+from src.services.request_profiler import PROFILE_HEADER, get_request_profiler
+from src.services.request_recorder import get_request_recorder
+
+logger = get_logger("api.middleware")
+
+# Room for multipart boundaries and part headers on top of the file itself.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """Rejects request bodies over the limit while they are still being received."""
+
+    def __init__(self, app: Callable, max_body_size: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = self.path_limits.get(scope["path"], self.max_body_size)
+        content_length = self._content_length(scope)
+        if content_length is not None and content_length > max_body_size:
+            ERRORS_TOTAL.inc(error_code="HTTP_413")
+            await self._reject(send, max_body_size)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    rejected = True
+                    ERRORS_TOTAL.inc(error_code="HTTP_413")
+                    logger.warning("Aborted upload after %d bytes (limit %d)", received, max_body_size)
+                    await self._reject(send, max_body_size)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Dict[str, Any]) -> None:
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    def _content_length(scope: Dict[str, Any]) -> Optional[int]:
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _reject(send: Callable, max_body_size: int) -> None:
+        size_mb = (max_body_size - MULTIPART_OVERHEAD) / (1024 * 1024)
+        body = json.dumps({"detail": f"Request too large. Maximum size: {size_mb:.1f}MB"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class RequestMetricsMiddleware:
+    """Records total request time per route template, so path parameters do not create new series."""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched")
+            )
+
+
+class RequestRecordingMiddleware:
+    """Logs sampled uploads with their arrival time so production traffic can be replayed later."""
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self.recorder = get_request_recorder()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.recorder.paths
+            or random.random() >= self.recorder.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = self.recorder.open_body()
+        if body is None:
+            await self.app(scope, receive, send)
+            return
+
+        arrived_at = time.time()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def recording_receive() -> Dict[str, Any]:
+            message = await receive()
+            if message["type"] == "http.request":
+                # Written as it arrives, so a recorded upload is never held in memory as a whole.
+                body.write(message.get("body", b""))
+            return message
+
+        async def recording_send(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            content_type = ""
+            for name, value in scope.get("headers", []):
+                if name == b"content-type":
+                    content_type = value.decode("latin-1")
+                    break
+            self.recorder.record({
+                "timestamp": arrived_at,
+                "endpoint": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "content_type": content_type,
+                "status": status_code,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3)
+            }, body)
+
+
+class ProfilingMiddleware:
+    """Starts a span tree for requests carrying the admin profiling token or picked by sampling."""
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self.profiler = get_request_profiler()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode("latin-1"):
+                token = value.decode("latin-1")
+                break
+
+        forced = self.profiler.should_trace(token)
+        if forced is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace, context_token = self.profiler.start_trace(scope["method"], scope["path"], forced)
+
+        async def traced_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-trace-id", trace.trace_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            self.profiler.finish_trace(trace, context_token)
+
+
+class DeadlineMiddleware:
+    """Gives each request a deadline and cancels it when the client disconnects mid-request.
+
+    Once the body has been read, nothing else receives from the client until the response is
+    sent, so a watcher takes over receive to notice the disconnect; the app's own later receive
+    calls share its result.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self.overload = get_overload_controller()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        for name, value in scope.get("headers", []):
+            if name == DEADLINE_HEADER.encode("latin-1"):
+                header_value = value.decode("latin-1")
+                break
+        deadline = self.overload.new_deadline(header_value)
+        if deadline is None:
+            await self.app(scope, receive, send)
+            return
+
+        watcher: Optional[asyncio.Task] = None
+        response_complete = False
+
+        async def watch_disconnect() -> Dict[str, Any]:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    if not response_complete:
+                        deadline.cancel()
+                    return message
+
+        async def watched_receive() -> Dict[str, Any]:
+            nonlocal watcher
+            if watcher is not None:
+                return await asyncio.shield(watcher)
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                watcher = asyncio.create_task(watch_disconnect())
+            elif message["type"] == "http.disconnect":
+                deadline.cancel()
+            return message
+
+        async def watched_send(message: Dict[str, Any]) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        token = set_current_deadline(deadline)
+        try:
+            await self.app(scope, watched_receive, watched_send)
+        finally:
+            reset_current_deadline(token)
+            if watcher is not None:
+                watcher.cancel()
@@ -1,15 +1,79 @@
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
-from src.schemas.request import audio_file
-from src.schemas.response import ClassificationResponse
-from src.services.classification_service import get_classification_service
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from src.config import get_config, get_logger
+from src.schemas.request import AudioUpload, ingest_audio_file
+from src.schemas.response import (
+    BatchClassificationItem,
+    BatchClassificationResponse,
+    ClassificationResponse,
+    JobResponse
+)
+from src.services.classification_service import ClassificationService, Recommender
+from src.services.classifier_batcher import ClassifierQueueFullError
+from src.services.generation_batcher import GenerationQueueFullError
+from src.services.inference_executor import (
+    get_inference_executor,
+    InferenceQueueFullError,
+    InferenceTimeoutError
+)
+from src.services.job_queue import JOB_DONE, JOB_FAILED, get_job_queue, JobQueueFullError
+from src.services.live_classifier import ENCODED_FORMAT, LiveStream, LiveStreamLimitError, get_live_classifier
+from src.services.overload_control import (
+    DeadlineExceededError,
+    get_overload_controller,
+    OverloadedError,
+    RequestCancelledError
+)
+from src.services.result_cache import get_result_cache
+from src.services.service_loader import get_service_loader
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["Music Genre Classification"]
 )
 
-classification_service = get_classification_service()
+config = get_config()
+logger = get_logger("api.endpoints")
+inference_executor = get_inference_executor()
+job_queue = get_job_queue()
+overload_controller = get_overload_controller()
+live_classifier = get_live_classifier()
+
+WARMUP_RETRY_AFTER_SECONDS = 10
+RECOMMENDER_QUERY = Query(
+    default=None,
+    description="Recommendation backend for this request (t5 or catalog); defaults to the server's backend"
+)
+JOB_POLL_INTERVAL = 0.5
+JOB_QUEUE_FULL_RETRY_AFTER_SECONDS = 30
+OVERLOAD_RETRY_AFTER_SECONDS = 5
+# Not a standard status: the client closed the connection before the response was ready.
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+
+def get_ready_service() -> ClassificationService:
+    loader = get_service_loader()
+    service = loader.get_service()
+    if service is not None:
+        return service
+
+    if loader.has_failed():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Classification model failed to load"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Models are still loading, please retry later",
+        headers={"Retry-After": str(WARMUP_RETRY_AFTER_SECONDS)}
+    )
 
 
 @router.post(
@@ -17,28 +81,350 @@ classification_service = get_classification_service()
     response_model=ClassificationResponse
 )
 async def classify_music(
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    recommender: Optional[str] = RECOMMENDER_QUERY,
+    classification_service: ClassificationService = Depends(get_ready_service)
 ) -> ClassificationResponse:
     try:
-        validated_file = await audio_file(file)
-        file_content = await validated_file.read()
-        result = classification_service.classify_with_recommendations(
-            file_bytes=file_content
+        classification_service.get_recommender(recommender)
+        upload = await ingest_audio_file(file)
+        result = await inference_executor.run(
+            classification_service.classify_with_recommendations,
+            upload,
+            recommender
         )
         return result
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _to_http_exception(e) from e
+
+
+@router.post(
+    "/classify/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def classify_music_stream(
+    file: UploadFile = File(...),
+    recommender: Optional[str] = RECOMMENDER_QUERY,
+    classification_service: ClassificationService = Depends(get_ready_service)
+) -> StreamingResponse:
+    try:
+        backend = classification_service.get_recommender(recommender)
+        upload = await ingest_audio_file(file)
+        classification = await inference_executor.run(classification_service.classify_cached, upload)
+        # Generation is admitted before the response starts, so a full executor is still a 429.
+        stream = _recommendation_stream(backend, classification.genre)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _to_http_exception(e) from e
+
+    return StreamingResponse(
+        _classification_events(backend, classification.genre, stream),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _recommendation_stream(backend: Optional[Recommender], genre: str) -> Iterator[str]:
+    if backend is None:
+        return iter(())
+    if overload_controller.should_degrade():
+        overload_controller.record_degraded()
+        return iter(backend.cached_recommendations(genre))
+    return backend.stream_dynamic_recommendations(genre)
+
+
+async def _classification_events(backend: Optional[Recommender], genre: str,
+                                 stream: Iterator[str]) -> AsyncIterator[str]:
+    yield _sse_event("genre", {"genre": genre})
+
+    chunks: List[str] = []
+    try:
+        async for chunk in iterate_in_threadpool(stream):
+            if chunk:
+                chunks.append(chunk)
+                yield _sse_event("token", {"text": chunk})
+    except Exception as e:
+        logger.error("Recommendation stream failed: %s", e)
+        yield _sse_event("error", {"detail": "Recommendation generation failed"})
+
+    if backend is not None and not backend.streams_tokens:
+        # Catalog backends stream whole recommendations rather than pieces of one text.
+        recommendations = chunks
+    else:
+        text = "".join(chunks).strip()
+        recommendations = [text] if text else []
+    response = ClassificationResponse(genre=genre, recommendations=recommendations)
+    yield _sse_event("done", response.model_dump())
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.websocket("/classify/live")
+async def classify_live(
+    websocket: WebSocket,
+    input_format: str = Query(default="pcm_s16le", alias="format"),
+    sample_rate: int = Query(default=16000),
+    channels: int = Query(default=1)
+) -> None:
+    """Classifies a live stream sent as binary messages and pushes smoothed genre updates.
+
+    Send `{"type": "end"}` as a text message to finish after the last update.
+    """
+    await websocket.accept()
+    service = get_service_loader().get_service()
+    if not live_classifier.enabled:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Live classification is disabled")
+        return
+    if service is None:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Models are still loading")
+        return
+    try:
+        stream = live_classifier.open_stream(input_format, sample_rate, channels)
     except ValueError as e:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+        return
+    except LiveStreamLimitError as e:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+        return
+
+    try:
+        await websocket.send_json({"type": "ready", **stream.describe()})
+        await _run_live_stream(websocket, service, stream)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_classifier.close_stream(stream)
+
+
+async def _run_live_stream(websocket: WebSocket, service: ClassificationService, stream: LiveStream) -> None:
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            chunk = message.get("bytes")
+            if chunk is None:
+                if _is_end_message(message.get("text")):
+                    break
+                continue
+
+            if len(chunk) > live_classifier.max_chunk_bytes:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG, reason="Audio chunk too large")
+                return
+            try:
+                if stream.input_format == ENCODED_FORMAT:
+                    await asyncio.to_thread(stream.feed, chunk)
+                else:
+                    stream.feed(chunk)
+            except ValueError as e:
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+                return
+
+            # At most one window per stream is in the classifier; later hops wait for it.
+            if stream.window_due() and (pending is None or pending.done()):
+                pending = asyncio.create_task(_send_live_update(websocket, service, stream))
+
+        if pending is not None:
+            await pending
+        await websocket.close()
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
+async def _send_live_update(websocket: WebSocket, service: ClassificationService, stream: LiveStream) -> None:
+    try:
+        results = await asyncio.wrap_future(live_classifier.submit(service.classifier_batcher, stream))
+        await websocket.send_json(stream.update(results))
+    except ClassifierQueueFullError:
+        stream.skipped += 1
+    except (WebSocketDisconnect, RuntimeError) as e:
+        logger.debug("Live update not sent: %s", e)
+    except Exception as e:
+        logger.error("Live classification failed: %s", e)
+
+
+def _is_end_message(text: Optional[str]) -> bool:
+    try:
+        return json.loads(text or "").get("type") == "end"
+    except (ValueError, AttributeError):
+        return False
+
+
+@router.post(
+    "/classify/batch",
+    response_model=BatchClassificationResponse
+)
+async def classify_music_batch(
+    files: List[UploadFile] = File(...),
+    recommender: Optional[str] = RECOMMENDER_QUERY,
+    classification_service: ClassificationService = Depends(get_ready_service)
+) -> BatchClassificationResponse:
+    max_files = config.settings.max_batch_files
+    if len(files) > max_files:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        ) from e
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Classification service temporarily unavailable"
-        ) from e
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many files. Maximum per batch: {max_files}"
+        )
+    try:
+        classification_service.get_recommender(recommender)
+    except ValueError as e:
+        raise _to_http_exception(e) from e
+
+    ingested: List[Optional[AudioUpload]] = []
+    errors: Dict[int, str] = {}
+    for index, file in enumerate(files):
+        try:
+            ingested.append(await ingest_audio_file(file))
+        except HTTPException as e:
+            ingested.append(None)
+            errors[index] = str(e.detail)
+
+    uploads = [upload for upload in ingested if upload is not None]
+    try:
+        classified = (
+            await inference_executor.run(classification_service.classify_batch, uploads, recommender) if uploads else []
+        )
     except Exception as e:
+        raise _to_http_exception(e) from e
+
+    classified_items = iter(classified)
+    results = [
+        BatchClassificationItem(filename=file.filename, error=errors[index]) if index in errors
+        else next(classified_items)
+        for index, file in enumerate(files)
+    ]
+    return BatchClassificationResponse(results=results)
+
+
+@router.post(
+    "/jobs",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_job(file: UploadFile = File(...)) -> JobResponse:
+    if not job_queue.enabled:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is disabled"
+        )
+
+    upload = await ingest_audio_file(file)
+    try:
+        job = await asyncio.to_thread(job_queue.submit, upload)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(JOB_QUEUE_FULL_RETRY_AFTER_SECONDS)}
         ) from e
+    return JobResponse(**job)
+
+
+@router.get("/jobs/stats")
+async def job_stats() -> Dict[str, Any]:
+    return await asyncio.to_thread(job_queue.get_stats)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse
+)
+async def get_job(
+    job_id: str,
+    wait: float = Query(default=0.0, ge=0.0, description="Seconds to wait for the job to finish")
+) -> JobResponse:
+    deadline = time.monotonic() + min(wait, job_queue.long_poll_max)
+    while True:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found"
+            )
+        if job["status"] in (JOB_DONE, JOB_FAILED) or time.monotonic() >= deadline:
+            return JobResponse(**job)
+        await asyncio.sleep(min(JOB_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def _to_http_exception(error: Exception) -> HTTPException:
+    if isinstance(error, OverloadedError):
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Service is overloaded, please retry later",
+            headers={"Retry-After": str(OVERLOAD_RETRY_AFTER_SECONDS)}
+        )
+    if isinstance(error, DeadlineExceededError):
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(error)
+        )
+    if isinstance(error, RequestCancelledError):
+        return HTTPException(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+            detail=str(error)
+        )
+    if isinstance(error, (InferenceQueueFullError, ClassifierQueueFullError, GenerationQueueFullError)):
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many classification requests in progress, please retry later",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(error, InferenceTimeoutError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Classification timed out, please retry later"
+        )
+    if isinstance(error, ValueError):
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
+    if isinstance(error, RuntimeError):
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Classification service temporarily unavailable"
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="An unexpected error occurred"
+    )
+
+
+@router.get("/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    return get_result_cache().get_stats()
+
+
+@router.get("/live/stats")
+async def live_stats() -> Dict[str, Any]:
+    return live_classifier.get_stats()
+
+
+@router.get("/overload/stats")
+async def overload_stats() -> Dict[str, Any]:
+    return overload_controller.get_stats()
+
+
+@router.get("/fingerprints/stats")
+async def fingerprint_stats(
+    classification_service: ClassificationService = Depends(get_ready_service)
+) -> Dict[str, Any]:
+    return classification_service.fingerprint_index.get_stats()
+
+
+@router.get("/recommendations/pool/stats")
+async def recommendation_pool_stats(
+    classification_service: ClassificationService = Depends(get_ready_service)
+) -> Dict[str, Any]:
+    if classification_service.dynamic_recommendation_service is None:
+        return {"enabled": False}
+    return classification_service.dynamic_recommendation_service.get_pool_stats()
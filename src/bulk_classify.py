@@ -0,0 +1,234 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.config import get_config, get_logger
+
+logger = get_logger("bulk_classify")
+config = get_config()
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg", ".m4a")
+CSV_FIELDS = ("path", "genre", "duration", "recommendations", "error")
+_PROGRESS_INTERVAL = 10.0
+
+_worker_processor: Any = None
+
+
+def _init_decode_worker() -> None:
+    global _worker_processor
+    from src.services.classification_service import AudioProcessor
+
+    _worker_processor = AudioProcessor()
+
+
+def _decode_file(path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[float], Optional[str]]:
+    from src.schemas.request import AudioUpload
+
+    try:
+        upload = AudioUpload.from_bytes(Path(path).read_bytes(), filename=path)
+        audio_dict, metadata = _worker_processor.process_audio_file(upload)
+        return path, audio_dict, metadata.duration, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def find_audio_files(inputs: Iterable[str], extensions: Tuple[str, ...]) -> Iterator[str]:
+    for value in inputs:
+        path = Path(value)
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and child.suffix.lower() in extensions:
+                    yield str(child)
+        elif path.is_file():
+            yield str(path)
+        else:
+            logger.warning("Skipping missing path %s", value)
+
+
+class ResultWriter:
+    """Appends one row per file and flushes it, so an interrupted run can resume from the output."""
+
+    def __init__(self, path: Path, output_format: str):
+        self.path = path
+        self.format = output_format
+        exists = path.exists() and path.stat().st_size > 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv: Optional[csv.DictWriter] = None
+        if output_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
+            if not exists:
+                self._csv.writeheader()
+
+    @staticmethod
+    def completed_paths(path: Path, output_format: str) -> Set[str]:
+        if not path.exists():
+            return set()
+        completed = set()
+        with open(path, encoding="utf-8", newline="") as file:
+            rows: Iterable[Dict[str, Any]]
+            if output_format == "csv":
+                rows = csv.DictReader(file)
+            else:
+                rows = (json.loads(line) for line in file if line.strip())
+            for row in rows:
+                if row.get("genre") and not row.get("error"):
+                    completed.add(row["path"])
+        return completed
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._csv is not None:
+            self._csv.writerow({
+                **row,
+                "recommendations": " | ".join(row.get("recommendations") or [])
+            })
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BulkClassifier:
+    """Decodes files in a process pool and feeds the waveforms to the batched classifier.
+
+    At most max_in_flight files are decoding, decoded or classifying at once, which bounds memory.
+    """
+
+    def __init__(self, decode_workers: int, inference_threads: int, max_in_flight: int, recommendations: bool):
+        from src.services.classification_service import ClassificationService
+
+        self.decode_workers = max(1, decode_workers)
+        self.inference_threads = max(1, inference_threads)
+        self.max_in_flight = max(self.decode_workers + self.inference_threads, max_in_flight)
+        self.recommendations = recommendations
+        self.service = ClassificationService(recommendations_enabled=recommendations)
+
+    def run(self, paths: List[str], writer: ResultWriter) -> Dict[str, Any]:
+        processed = errors = 0
+        start = last_report = time.perf_counter()
+        remaining = iter(paths)
+        decoding: Dict[Future, str] = {}
+        classifying: Dict[Future, Tuple[str, Optional[float]]] = {}
+
+        # Spawned workers do not inherit the loaded models or torch's thread pool.
+        decode_pool = ProcessPoolExecutor(
+            max_workers=self.decode_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_decode_worker
+        )
+        inference_pool = ThreadPoolExecutor(max_workers=self.inference_threads, thread_name_prefix="bulk-inference")
+        try:
+            while True:
+                while len(decoding) + len(classifying) < self.max_in_flight:
+                    path = next(remaining, None)
+                    if path is None:
+                        break
+                    decoding[decode_pool.submit(_decode_file, path)] = path
+                if not decoding and not classifying:
+                    break
+
+                done, _ = wait(list(decoding) + list(classifying), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in decoding:
+                        path = decoding.pop(future)
+                        try:
+                            _, audio_dict, duration, error = future.result()
+                        except Exception as e:
+                            audio_dict, duration, error = None, None, str(e)
+                        if error is not None:
+                            writer.write({"path": path, "genre": None, "duration": None, "error": error})
+                            processed += 1
+                            errors += 1
+                            continue
+                        classifying[inference_pool.submit(self._classify, audio_dict)] = (path, duration)
+                    else:
+                        path, duration = classifying.pop(future)
+                        row: Dict[str, Any] = {"path": path, "genre": None, "duration": duration, "error": None}
+                        try:
+                            genre, recommendations = future.result()
+                            row["genre"] = genre
+                            if self.recommendations:
+                                row["recommendations"] = recommendations
+                        except Exception as e:
+                            row["error"] = str(e)
+                            errors += 1
+                        writer.write(row)
+                        processed += 1
+
+                now = time.perf_counter()
+                if now - last_report >= _PROGRESS_INTERVAL:
+                    last_report = now
+                    logger.info(
+                        "%d/%d files, %d errors, %.2f files/sec",
+                        processed, len(paths), errors, processed / (now - start)
+                    )
+        finally:
+            decode_pool.shutdown(wait=True, cancel_futures=True)
+            inference_pool.shutdown(wait=True, cancel_futures=True)
+            self.service.shutdown()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "files": processed,
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "files_per_sec": round(processed / elapsed, 3) if elapsed > 0 else 0.0
+        }
+
+    def _classify(self, audio_dict: Dict[str, Any]) -> Tuple[str, List[str]]:
+        genre = self.service.classify_decoded(audio_dict)
+        recommendations = self.service.recommend(genre) if self.recommendations else []
+        return genre, recommendations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    batching_config = config.get_batching_config()
+    parser = argparse.ArgumentParser(description="Classify local audio files without going through the HTTP API.")
+    parser.add_argument("inputs", nargs="+", help="Audio files or directories (searched recursively)")
+    parser.add_argument("--output", type=Path, required=True, help="Results file; .csv writes CSV, anything else JSONL")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None)
+    parser.add_argument("--decode-workers", type=int, default=config.settings.batch_decode_workers)
+    parser.add_argument("--inference-threads", type=int, default=batching_config['max_batch_size'],
+                        help="Files classified concurrently; their clips share batched forward passes")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Files held in memory across all stages (default: 2x decode workers + inference threads)")
+    parser.add_argument("--no-recommendations", action="store_true", help="Skip T5 recommendations")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess files already present in the output")
+    parser.add_argument("--extensions", default=",".join(AUDIO_EXTENSIONS))
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ("csv" if args.output.suffix.lower() == ".csv" else "jsonl")
+    extensions = tuple(ext.strip().lower() for ext in args.extensions.split(",") if ext.strip())
+    paths = list(find_audio_files(args.inputs, extensions))
+
+    if not args.no_resume:
+        completed = ResultWriter.completed_paths(args.output, output_format)
+        if completed:
+            paths = [path for path in paths if path not in completed]
+            logger.info("Resuming: %d files already classified", len(completed))
+    if not paths:
+        logger.info("Nothing to classify")
+        return 0
+
+    max_in_flight = args.max_in_flight or 2 * args.decode_workers + args.inference_threads
+    classifier = BulkClassifier(args.decode_workers, args.inference_threads, max_in_flight, not args.no_recommendations)
+    writer = ResultWriter(args.output, output_format)
+    try:
+        summary = classifier.run(paths, writer)
+    finally:
+        writer.close()
+
+    print(json.dumps(summary))
+    return 1 if summary["errors"] == summary["files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
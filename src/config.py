@@ -25,6 +25,88 @@ class Settings(BaseModel):
     log_file: Optional[str] = Field(default=None)
     torch_num_threads: int = Field(default=4)
     device_map: str = Field(default="auto")
+    inference_workers: int = Field(default=2)
+    inference_queue_size: int = Field(default=8)
+    inference_timeout: float = Field(default=120.0)
+    classifier_batch_size: int = Field(default=8)
+    classifier_batch_wait_ms: float = Field(default=10.0)
+    classifier_batch_queue_size: int = Field(default=64)
+    generation_batch_size: int = Field(default=8)
+    generation_batch_wait_ms: float = Field(default=20.0)
+    generation_batch_queue_size: int = Field(default=64)
+    result_cache_enabled: bool = Field(default=True)
+    result_cache_max_entries: int = Field(default=1024)
+    result_cache_ttl: float = Field(default=24 * 60 * 60)
+    result_cache_disk_enabled: bool = Field(default=False)
+    fingerprint_enabled: bool = Field(default=False)
+    fingerprint_seconds: float = Field(default=10.0)
+    fingerprint_similarity_threshold: float = Field(default=0.75)
+    fingerprint_max_entries: int = Field(default=10000)
+    fingerprint_disk_enabled: bool = Field(default=False)
+    recommendation_backend: str = Field(default="t5")
+    recommendation_catalog_path: Optional[str] = Field(default=None)
+    recommendation_catalog_top_k: int = Field(default=5)
+    recommendation_catalog_ivf_lists: int = Field(default=0)
+    recommendation_catalog_ivf_probes: int = Field(default=8)
+    recommendation_pool_enabled: bool = Field(default=True)
+    recommendation_pool_size: int = Field(default=8)
+    recommendation_pool_ttl: float = Field(default=6 * 60 * 60)
+    recommendation_pool_max_uses: int = Field(default=3)
+    recommendation_pool_strategy: str = Field(default="random")
+    classification_mode: str = Field(default="full")
+    segment_count: int = Field(default=3)
+    segment_duration: float = Field(default=10.0)
+    segment_hop: float = Field(default=5.0)
+    segment_selection: str = Field(default="even")
+    segment_aggregation: str = Field(default="mean_logit")
+    segment_early_stop_confidence: float = Field(default=0.0)
+    audio_decoder_backend: str = Field(default="librosa")
+    audio_resample_quality: str = Field(default="HQ")
+    model_warmup_enabled: bool = Field(default=True)
+    worker_processes: int = Field(default=1)
+    worker_torch_threads: int = Field(default=0)
+    audio_model_precision: str = Field(default="fp32")
+    text_model_precision: str = Field(default="fp32")
+    max_batch_files: int = Field(default=16)
+    batch_decode_workers: int = Field(default=4)
+    job_queue_enabled: bool = Field(default=True)
+    job_workers: int = Field(default=1)
+    job_queue_max_depth: int = Field(default=1000)
+    job_max_attempts: int = Field(default=3)
+    job_lease_timeout: float = Field(default=600.0)
+    job_retry_backoff: float = Field(default=5.0)
+    job_retention: float = Field(default=24 * 60 * 60)
+    job_long_poll_max: float = Field(default=30.0)
+    metrics_enabled: bool = Field(default=True)
+    profiling_sample_rate: float = Field(default=0.0)
+    profiling_admin_token: str = Field(default="")
+    profiling_capture: str = Field(default="none")
+    profiling_trace_dir: Optional[str] = Field(default=None)
+    profiling_slow_threshold_ms: float = Field(default=1000.0)
+    profiling_max_traces: int = Field(default=50)
+    request_log_dir: Optional[str] = Field(default=None)
+    request_log_sample_rate: float = Field(default=1.0)
+    request_log_paths: list = Field(default=["/api/v1/classify", "/api/v1/classify/stream"])
+    request_deadline: float = Field(default=120.0)
+    request_deadline_max: float = Field(default=600.0)
+    overload_control_enabled: bool = Field(default=True)
+    overload_degrade_wait: float = Field(default=1.0)
+    overload_shed_wait: float = Field(default=5.0)
+    overload_window: float = Field(default=10.0)
+    thread_budget_enabled: bool = Field(default=False)
+    thread_budget_cpus: float = Field(default=0.0)
+    thread_budget_classifier_threads: int = Field(default=0)
+    thread_budget_generation_threads: int = Field(default=0)
+    thread_budget_decode_threads: int = Field(default=0)
+    thread_budget_interop_threads: int = Field(default=0)
+    live_enabled: bool = Field(default=True)
+    live_window_seconds: float = Field(default=10.0)
+    live_hop_seconds: float = Field(default=2.0)
+    live_smoothing: float = Field(default=0.5)
+    live_switch_margin: float = Field(default=0.1)
+    live_switch_windows: int = Field(default=2)
+    live_max_streams: int = Field(default=64)
+    live_max_chunk_bytes: int = Field(default=1024 * 1024)
 
     class Config:
         case_sensitive = False
@@ -36,11 +118,35 @@ class Settings(BaseModel):
             env_name = field_name.upper()
             if env_name in os.environ:
                 env_value = os.environ[env_name]
-                if field_name in ['debug', 'api_reload']:
+                if field_name in ['debug', 'api_reload', 'result_cache_enabled', 'result_cache_disk_enabled',
+                                  'recommendation_pool_enabled', 'model_warmup_enabled', 'job_queue_enabled',
+                                  'metrics_enabled', 'fingerprint_enabled', 'fingerprint_disk_enabled',
+                                  'overload_control_enabled', 'thread_budget_enabled', 'live_enabled']:
                     kwargs[field_name] = env_value.lower() in ('true', '1', 'yes')
-                elif field_name in ['api_port', 'audio_sample_rate', 'max_audio_duration', 'max_file_size', 'torch_num_threads']:
+                elif field_name in ['api_port', 'audio_sample_rate', 'max_audio_duration', 'max_file_size', 'torch_num_threads',
+                                    'inference_workers', 'inference_queue_size', 'classifier_batch_size',
+                                    'classifier_batch_queue_size', 'generation_batch_size', 'generation_batch_queue_size',
+                                    'result_cache_max_entries', 'fingerprint_max_entries', 'recommendation_pool_size',
+                                    'recommendation_pool_max_uses', 'recommendation_catalog_top_k',
+                                    'recommendation_catalog_ivf_lists', 'recommendation_catalog_ivf_probes',
+                                    'segment_count', 'worker_processes',
+                                    'worker_torch_threads', 'max_batch_files', 'batch_decode_workers', 'job_workers',
+                                    'job_queue_max_depth', 'job_max_attempts', 'profiling_max_traces',
+                                    'thread_budget_classifier_threads', 'thread_budget_generation_threads',
+                                    'thread_budget_decode_threads', 'thread_budget_interop_threads',
+                                    'live_switch_windows', 'live_max_streams', 'live_max_chunk_bytes']:
                     kwargs[field_name] = int(env_value)
-                elif field_name == 'allowed_audio_formats':
+                elif field_name in ['inference_timeout', 'classifier_batch_wait_ms', 'generation_batch_wait_ms',
+                                    'result_cache_ttl', 'fingerprint_seconds', 'fingerprint_similarity_threshold',
+                                    'recommendation_pool_ttl', 'segment_duration', 'segment_hop',
+                                    'segment_early_stop_confidence', 'job_lease_timeout', 'job_retention',
+                                    'job_long_poll_max', 'job_retry_backoff', 'profiling_sample_rate', 'profiling_slow_threshold_ms',
+                                    'request_log_sample_rate', 'request_deadline', 'request_deadline_max',
+                                    'overload_degrade_wait', 'overload_shed_wait', 'overload_window',
+                                    'thread_budget_cpus', 'live_window_seconds', 'live_hop_seconds', 'live_smoothing',
+                                    'live_switch_margin']:
+                    kwargs[field_name] = float(env_value)
+                elif field_name in ['allowed_audio_formats', 'request_log_paths']:
                     kwargs[field_name] = env_value.split(',')
                 else:
                     kwargs[field_name] = env_value
@@ -108,6 +214,7 @@ class AppConfig:
     def get_audio_model_config(self) -> Dict[str, Any]:
         return {
             "model_name": self.settings.audio_model_name,
+            "precision": self.settings.audio_model_precision,
             "cache_dir": self.settings.model_cache_dir,
             "device_map": self.settings.device_map,
             "torch_num_threads": self.settings.torch_num_threads,
@@ -125,6 +232,7 @@ class AppConfig:
     def get_text_model_config(self) -> Dict[str, Any]:
         return {
             "model_name": self.settings.text_model_name,
+            "precision": self.settings.text_model_precision,
             "cache_dir": self.settings.model_cache_dir,
             "device_map": "cpu",
             "torch_num_threads": self.settings.torch_num_threads,
@@ -150,9 +258,173 @@ class AppConfig:
             "debug": self.settings.debug
         }
 
+    def get_inference_config(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.settings.inference_workers,
+            "max_queue_size": self.settings.inference_queue_size,
+            "timeout": self.settings.inference_timeout
+        }
+
+    def get_batching_config(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.settings.classifier_batch_size,
+            "max_wait_ms": self.settings.classifier_batch_wait_ms,
+            "max_queue_size": self.settings.classifier_batch_queue_size
+        }
+
+    def get_generation_batching_config(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.settings.generation_batch_size,
+            "max_wait_ms": self.settings.generation_batch_wait_ms,
+            "max_queue_size": self.settings.generation_batch_queue_size
+        }
+
+    def get_result_cache_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.result_cache_enabled,
+            "max_entries": self.settings.result_cache_max_entries,
+            "ttl": self.settings.result_cache_ttl,
+            "disk_enabled": self.settings.result_cache_disk_enabled,
+            "disk_dir": str(Path(self.settings.model_cache_dir) / "result_cache")
+        }
+
+    def get_fingerprint_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.fingerprint_enabled,
+            "seconds": self.settings.fingerprint_seconds,
+            "similarity_threshold": self.settings.fingerprint_similarity_threshold,
+            "max_entries": self.settings.fingerprint_max_entries,
+            "disk_enabled": self.settings.fingerprint_disk_enabled,
+            "disk_dir": str(Path(self.settings.model_cache_dir) / "fingerprints")
+        }
+
+    def get_recommendation_catalog_config(self) -> Dict[str, Any]:
+        return {
+            "backend": self.settings.recommendation_backend,
+            "path": self.settings.recommendation_catalog_path,
+            "top_k": self.settings.recommendation_catalog_top_k,
+            "ivf_lists": self.settings.recommendation_catalog_ivf_lists,
+            "ivf_probes": self.settings.recommendation_catalog_ivf_probes
+        }
+
+    def get_recommendation_pool_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.recommendation_pool_enabled,
+            "size": self.settings.recommendation_pool_size,
+            "ttl": self.settings.recommendation_pool_ttl,
+            "max_uses": self.settings.recommendation_pool_max_uses,
+            "strategy": self.settings.recommendation_pool_strategy,
+            "path": str(Path(self.settings.model_cache_dir) / "recommendation_pools.json")
+        }
+
+    def get_job_queue_config(self) -> Dict[str, Any]:
+        job_dir = Path(self.settings.model_cache_dir) / "jobs"
+        return {
+            "enabled": self.settings.job_queue_enabled,
+            "workers": self.settings.job_workers,
+            "max_depth": self.settings.job_queue_max_depth,
+            "max_attempts": self.settings.job_max_attempts,
+            "lease_timeout": self.settings.job_lease_timeout,
+            "retry_backoff": self.settings.job_retry_backoff,
+            "retention": self.settings.job_retention,
+            "long_poll_max": self.settings.job_long_poll_max,
+            "db_path": str(job_dir / "jobs.db"),
+            "upload_dir": str(job_dir / "uploads")
+        }
+
+    def get_profiling_config(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.settings.profiling_sample_rate,
+            "admin_token": self.settings.profiling_admin_token,
+            "capture": self.settings.profiling_capture,
+            "trace_dir": self.settings.profiling_trace_dir or str(Path(self.settings.model_cache_dir) / "traces"),
+            "slow_threshold_ms": self.settings.profiling_slow_threshold_ms,
+            "max_traces": self.settings.profiling_max_traces
+        }
+
+    def get_request_log_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": bool(self.settings.request_log_dir),
+            "directory": self.settings.request_log_dir,
+            "sample_rate": self.settings.request_log_sample_rate,
+            "paths": self.settings.request_log_paths
+        }
+
+    def get_overload_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.overload_control_enabled,
+            "default_deadline": self.settings.request_deadline,
+            "max_deadline": self.settings.request_deadline_max,
+            "degrade_wait": self.settings.overload_degrade_wait,
+            "shed_wait": self.settings.overload_shed_wait,
+            "window": self.settings.overload_window
+        }
+
+    def get_segment_config(self) -> Dict[str, Any]:
+        return {
+            "mode": self.settings.classification_mode,
+            "count": self.settings.segment_count,
+            "duration": self.settings.segment_duration,
+            "hop": self.settings.segment_hop,
+            "selection": self.settings.segment_selection,
+            "aggregation": self.settings.segment_aggregation,
+            "early_stop_confidence": self.settings.segment_early_stop_confidence
+        }
+
+    def get_decoder_config(self) -> Dict[str, Any]:
+        return {
+            "backend": self.settings.audio_decoder_backend,
+            "resample_quality": self.settings.audio_resample_quality,
+            "sample_rate": self.settings.audio_sample_rate
+        }
+
+    def get_worker_config(self) -> Dict[str, Any]:
+        workers = max(1, self.settings.worker_processes)
+        threads = self.settings.worker_torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        return {
+            "workers": workers,
+            "torch_threads": threads,
+            "host": self.settings.api_host,
+            "port": self.settings.api_port
+        }
+
+    def get_thread_budget_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.thread_budget_enabled,
+            # Only an explicitly configured value, so the budget can say it is overriding it.
+            "torch_num_threads": (
+                self.settings.torch_num_threads if "torch_num_threads" in self.settings.model_fields_set else None
+            ),
+            "cpus": self.settings.thread_budget_cpus,
+            "processes": max(1, self.settings.worker_processes),
+            "process_threads": self.settings.worker_torch_threads,
+            "classifier_threads": self.settings.thread_budget_classifier_threads,
+            "generation_threads": self.settings.thread_budget_generation_threads,
+            "decode_threads": self.settings.thread_budget_decode_threads,
+            "interop_threads": self.settings.thread_budget_interop_threads,
+            "decode_workers": self.settings.inference_workers + self.settings.batch_decode_workers,
+            "generation_enabled": self.settings.recommendation_backend == "t5"
+        }
+
+    def get_live_config(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.settings.live_enabled,
+            "window_seconds": self.settings.live_window_seconds,
+            "hop_seconds": self.settings.live_hop_seconds,
+            "smoothing": self.settings.live_smoothing,
+            "switch_margin": self.settings.live_switch_margin,
+            "switch_windows": self.settings.live_switch_windows,
+            "max_streams": self.settings.live_max_streams,
+            "max_chunk_bytes": self.settings.live_max_chunk_bytes,
+            "sample_rate": self.settings.audio_sample_rate,
+            "resample_quality": self.settings.audio_resample_quality
+        }
+
     def get_file_config(self) -> Dict[str, Any]:
         return {
             "max_file_size": self.settings.max_file_size,
+            "max_batch_files": self.settings.max_batch_files,
+            "batch_decode_workers": self.settings.batch_decode_workers,
             "allowed_formats": self.settings.allowed_audio_formats,
             "max_duration": self.settings.max_audio_duration,
             "sample_rate": self.settings.audio_sample_rate
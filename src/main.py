@@ -1,20 +1,55 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.exception_handlers import http_exception_handler, request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 
 from src.config import get_config
+from src.api.middleware import (
+    MULTIPART_OVERHEAD,
+    DeadlineMiddleware,
+    ProfilingMiddleware,
+    RequestMetricsMiddleware,
+    RequestRecordingMiddleware,
+    UploadSizeLimitMiddleware
+)
 from src.api.v1.endpoints import router
+from src.services.inference_executor import get_inference_executor
+from src.services.job_queue import get_job_queue
+from src.services.memory_report import get_memory_report
+from src.services.metrics import ERRORS_TOTAL, get_metrics_registry
+from src.services.request_profiler import PROFILE_HEADER, get_request_profiler
+from src.services.request_recorder import get_request_recorder
+from src.services.service_loader import get_service_loader
+from src.services.thread_budget import get_thread_budget
 
 config = get_config()
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    service_loader = get_service_loader()
+    service_loader.start()
+    yield
+    get_job_queue().stop()
+    get_request_recorder().shutdown()
+    get_inference_executor().shutdown(wait=False)
+    service = service_loader.get_service()
+    if service is not None:
+        service.shutdown()
+
+
 app = FastAPI(
     title=config.settings.app_name,
     version=config.settings.app_version,
     docs_url="/docs",
     redoc_url=None,
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -30,6 +65,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added before the size limit so it sits inside it and only sees uploads that were accepted.
+if config.get_request_log_config()['enabled']:
+    app.add_middleware(RequestRecordingMiddleware)
+
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=config.settings.max_file_size + MULTIPART_OVERHEAD,
+    path_limits={
+        "/api/v1/classify/batch": (config.settings.max_file_size + MULTIPART_OVERHEAD) * config.settings.max_batch_files
+    }
+)
+
+app.add_middleware(DeadlineMiddleware)
+
+app.add_middleware(ProfilingMiddleware)
+
+if config.settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(router)
 
 
@@ -43,8 +97,66 @@ async def root():
     }
 
 
+@app.get("/health/live", tags=["System"])
+async def health_live():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["System"])
+async def health_ready():
+    service_status = get_service_loader().get_status()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if service_status["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=service_status
+    )
+
+
+@app.get("/health/memory", tags=["System"])
+async def health_memory():
+    return get_memory_report()
+
+
+@app.get("/health/threads", tags=["System"])
+async def health_threads():
+    return get_thread_budget().get_report()
+
+
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+async def metrics():
+    if not config.settings.metrics_enabled:
+        return PlainTextResponse("Metrics are disabled\n", status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(
+        get_metrics_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/debug/traces", tags=["System"])
+async def debug_traces(request: Request, limit: int = 20):
+    profiler = get_request_profiler()
+    # Traces expose request paths and timings, so they are only served to the token holder.
+    if not profiler.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling admin token is not configured")
+    if not profiler.is_authorized(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling token required")
+    return {"traces": profiler.get_traces(limit=max(1, min(limit, 100)))}
+
+
+@app.exception_handler(HTTPException)
+async def counting_http_exception_handler(request: Request, exc: HTTPException):
+    ERRORS_TOTAL.inc(error_code=f"HTTP_{exc.status_code}")
+    return await http_exception_handler(request, exc)
+
+
+@app.exception_handler(RequestValidationError)
+async def counting_validation_exception_handler(request: Request, exc: RequestValidationError):
+    ERRORS_TOTAL.inc(error_code="VALIDATION_ERROR")
+    return await request_validation_exception_handler(request, exc)
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    ERRORS_TOTAL.inc(error_code="UNHANDLED_EXCEPTION")
     return JSONResponse(
         status_code=500,
         content={
@@ -59,11 +171,15 @@ async def global_exception_handler(request: Request, exc: Exception):
 if __name__ == "__main__":
     api_config = config.get_api_config()
 
-    uvicorn.run(
-        "src.main:app",
-        host=api_config["host"],
-        port=api_config["port"],
-        reload=api_config["reload"],
-        log_level="info" if not config.settings.debug else "debug",
-        access_log=True
-    )
\ No newline at end of file
+    if config.settings.worker_processes > 1:
+        from src.prefork import run_prefork
+        run_prefork()
+    else:
+        uvicorn.run(
+            "src.main:app",
+            host=api_config["host"],
+            port=api_config["port"],
+            reload=api_config["reload"],
+            log_level="info" if not config.settings.debug else "debug",
+            access_log=True
+        )
\ No newline at end of file
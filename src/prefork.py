@@ -0,0 +1,127 @@
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict
+
+import torch
+import uvicorn
+
+from src.config import get_config, get_logger
+from src.services.memory_report import read_process_memory
+from src.services.service_loader import get_service_loader
+from src.services.thread_budget import get_thread_budget
+
+logger = get_logger("prefork")
+config = get_config()
+
+_RESPAWN_DELAY = 1.0
+
+
+class PreforkLauncher:
+    """Loads the models once, then forks workers that share the weight pages copy-on-write."""
+
+    def __init__(self):
+        self._worker_config: Dict[str, Any] = config.get_worker_config()
+        self.workers: int = self._worker_config['workers']
+        self.thread_budget = get_thread_budget()
+        self.torch_threads: int = (
+            self.thread_budget.stage_threads("classifier") if self.thread_budget.enabled
+            else self._worker_config['torch_threads']
+        )
+        self._children: Dict[int, int] = {}
+        self._stopping = False
+        self._socket: socket.socket
+
+    def run(self) -> None:
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Pre-fork worker mode requires a platform with fork()")
+
+        from src.main import app
+
+        self._socket = self._bind()
+        if get_service_loader().load() is None:
+            raise RuntimeError("Model loading failed, not starting workers")
+
+        # Objects that survive until fork are never moved by the collector, so its
+        # bookkeeping does not dirty the shared pages in every worker.
+        gc.collect()
+        gc.freeze()
+        self._log_memory("launcher after model load", os.getpid())
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for index in range(self.workers):
+            self._spawn(app, index)
+        self._supervise(app)
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self._worker_config['host'], self._worker_config['port']))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, app: Any, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = index
+            logger.info("Started worker %d (pid %d, %d torch threads)", index, pid, self.torch_threads)
+            return
+
+        exit_code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            os.environ["WORKER_INDEX"] = str(index)
+            torch.set_num_threads(self.torch_threads)
+            server = uvicorn.Server(uvicorn.Config(
+                app,
+                log_level="info" if not config.settings.debug else "debug",
+                access_log=True
+            ))
+            server.run(sockets=[self._socket])
+            exit_code = 0
+        except Exception as e:
+            logger.error("Worker %d crashed: %s", index, e)
+        finally:
+            os._exit(exit_code)
+
+    def _supervise(self, app: Any) -> None:
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self._children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+            logger.warning("Worker %d (pid %d) exited with status %d, restarting", index, pid, status)
+            time.sleep(_RESPAWN_DELAY)
+            self._spawn(app, index)
+        self._socket.close()
+
+    def _handle_stop(self, signum: int, _: Any) -> None:
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    @staticmethod
+    def _log_memory(label: str, pid: int) -> None:
+        usage = read_process_memory(pid)
+        if usage is not None:
+            logger.info("Memory %s: rss=%d MB pss=%d MB", label, usage["rss_kb"] // 1024, usage["pss_kb"] // 1024)
+
+
+def run_prefork() -> None:
+    PreforkLauncher().run()
+
+
+if __name__ == "__main__":
+    run_prefork()
@@ -1,13 +1,70 @@
+import hashlib
 import io
 import logging
-from typing import Optional
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile, HTTPException, status
 
 from src.config import get_config
+from src.services.metrics import STAGE_SECONDS
+from src.services.request_profiler import span
 
 logger = logging.getLogger("music_genre_bot.schemas.request")
 config = get_config()
 
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class AudioUpload:
+    """An uploaded audio file kept in a single buffer and handed to the decoder by reference."""
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        size: int,
+        sha256: str,
+        audio_format: str,
+        mime_type: str,
+        filename: Optional[str] = None
+    ):
+        self._file = file
+        self.size = size
+        self.sha256 = sha256
+        self.format = audio_format
+        self.mime_type = mime_type
+        self.filename = filename
+
+    @classmethod
+    def from_bytes(cls, file_bytes: bytes, filename: Optional[str] = None) -> "AudioUpload":
+        audio_format, mime_type = sniff_audio_format(file_bytes[:16])
+        return cls(
+            file=io.BytesIO(file_bytes),
+            size=len(file_bytes),
+            sha256=hashlib.sha256(file_bytes).hexdigest(),
+            audio_format=audio_format,
+            mime_type=mime_type,
+            filename=filename
+        )
+
+    def open(self) -> BinaryIO:
+        self._file.seek(0)
+        return self._file
+
+
+def sniff_audio_format(header: bytes) -> Tuple[str, str]:
+    if header.startswith(b"ID3"):
+        return "mp3", "audio/mpeg"
+    if len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0 and (header[1] & 0x06) != 0:
+        return "mp3", "audio/mpeg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "wav", "audio/wav"
+    if header.startswith(b"fLaC"):
+        return "flac", "audio/flac"
+    if header.startswith(b"OggS"):
+        return "ogg", "audio/ogg"
+    if header[4:8] == b"ftyp":
+        return "mp4", "audio/mp4"
+    return "unknown", "application/octet-stream"
+
 
 class AudioFileValidator:
     @staticmethod
@@ -36,15 +93,15 @@ class AudioFileValidator:
             )
 
     @staticmethod
-    def validate_file_content(file_content: bytes) -> None:
-        if not file_content:
+    def validate_file_content(file_size: int) -> None:
+        if file_size == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Empty file received"
             )
 
 
-async def audio_file(file: UploadFile) -> UploadFile:
+async def ingest_audio_file(file: UploadFile) -> AudioUpload:
     if file is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -52,17 +109,8 @@ async def audio_file(file: UploadFile) -> UploadFile:
         )
 
     try:
-        AudioFileValidator.validate_content_type(file.content_type)
-
-        file_content = await file.read()
-        file_size = len(file_content)
-
-        AudioFileValidator.validate_file_size(file_size)
-        AudioFileValidator.validate_file_content(file_content)
-
-        file.file = io.BytesIO(file_content)
-        return file
-
+        with STAGE_SECONDS.time(stage="upload_read"), span("validation"):
+            return await _read_upload(file)
     except HTTPException:
         raise
     except Exception as e:
@@ -71,3 +119,34 @@ async def audio_file(file: UploadFile) -> UploadFile:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Unable to process uploaded file"
         ) from e
+
+
+async def _read_upload(file: UploadFile) -> AudioUpload:
+    await file.seek(0)
+    digest = hashlib.sha256()
+    header = b""
+    file_size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not header:
+            header = chunk[:16]
+        file_size += len(chunk)
+        AudioFileValidator.validate_file_size(file_size)
+        digest.update(chunk)
+
+    AudioFileValidator.validate_file_content(file_size)
+
+    audio_format, mime_type = sniff_audio_format(header)
+    AudioFileValidator.validate_content_type(mime_type)
+
+    return AudioUpload(
+        file=file.file,
+        size=file_size,
+        sha256=digest.hexdigest(),
+        audio_format=audio_format,
+        mime_type=mime_type,
+        filename=file.filename
+    )
+
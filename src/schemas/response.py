@@ -12,4 +12,28 @@ class AudioMetadata(BaseModel):
 
 class ClassificationResponse(BaseModel):
     genre: str
-    recommendations: List[str]
\ No newline at end of file
+    recommendations: List[str]
+
+
+class BatchClassificationItem(BaseModel):
+    filename: Optional[str] = None
+    genre: Optional[str] = None
+    recommendations: List[str] = []
+    error: Optional[str] = None
+
+
+class BatchClassificationResponse(BaseModel):
+    results: List[BatchClassificationItem]
+
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    filename: Optional[str] = None
+    attempts: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ClassificationResponse] = None
+    error: Optional[str] = None
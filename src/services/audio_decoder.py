@@ -0,0 +1,121 @@
+from typing import BinaryIO, Dict, Optional, Type
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+from src.config import get_config, get_logger
+
+logger = get_logger("audio_decoder")
+config = get_config()
+
+RESAMPLE_QUALITIES = ("QQ", "LQ", "MQ", "HQ", "VHQ")
+
+
+class AudioInfo:
+    __slots__ = ("duration", "sample_rate", "channels", "frames", "format")
+
+    def __init__(self, duration: float, sample_rate: int, channels: int, frames: int, audio_format: str):
+        self.duration = duration
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = frames
+        self.format = audio_format
+
+
+class AudioDecoder:
+    name = "base"
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def probe(self, file: BinaryIO) -> Optional[AudioInfo]:
+        return None
+
+    def decode(self, file: BinaryIO, offset: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+        raise NotImplementedError
+
+
+class LibrosaDecoder(AudioDecoder):
+    name = "librosa"
+
+    def decode(self, file: BinaryIO, offset: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+        file.seek(0)
+        waveform, _ = librosa.load(
+            file,
+            sr=self.sample_rate,
+            mono=True,
+            offset=offset,
+            duration=duration,
+            dtype=np.float32
+        )
+        return waveform
+
+
+class SoundFileDecoder(AudioDecoder):
+    """Reads only the requested frames through libsndfile and resamples them with soxr."""
+
+    name = "soundfile"
+
+    def __init__(self, sample_rate: int, resample_quality: str = "HQ"):
+        super().__init__(sample_rate)
+        if resample_quality not in RESAMPLE_QUALITIES:
+            raise ValueError(f"Unknown resample quality: {resample_quality}")
+        self.resample_quality = resample_quality
+        self._fallback = LibrosaDecoder(sample_rate)
+
+    def probe(self, file: BinaryIO) -> Optional[AudioInfo]:
+        try:
+            file.seek(0)
+            with sf.SoundFile(file) as audio:
+                return AudioInfo(
+                    duration=audio.frames / audio.samplerate,
+                    sample_rate=audio.samplerate,
+                    channels=audio.channels,
+                    frames=audio.frames,
+                    audio_format=audio.format.lower()
+                )
+        except Exception as e:
+            logger.debug("Header probe failed, duration will be checked after decoding: %s", e)
+            return None
+
+    def decode(self, file: BinaryIO, offset: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+        try:
+            file.seek(0)
+            with sf.SoundFile(file) as audio:
+                start = min(int(offset * audio.samplerate), audio.frames)
+                frames = -1 if duration is None else int(duration * audio.samplerate)
+                if start:
+                    audio.seek(start)
+                data = audio.read(frames, dtype="float32", always_2d=True)
+                native_rate = audio.samplerate
+        except sf.LibsndfileError as e:
+            logger.debug("libsndfile cannot decode this file, falling back to librosa: %s", e)
+            return self._fallback.decode(file, offset=offset, duration=duration)
+
+        waveform = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+        if native_rate != self.sample_rate and len(waveform):
+            waveform = soxr.resample(waveform, native_rate, self.sample_rate, quality=self.resample_quality)
+        return np.ascontiguousarray(waveform, dtype=np.float32)
+
+
+DECODER_BACKENDS: Dict[str, Type[AudioDecoder]] = {
+    LibrosaDecoder.name: LibrosaDecoder,
+    SoundFileDecoder.name: SoundFileDecoder,
+}
+
+
+def create_audio_decoder(
+    backend: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    resample_quality: Optional[str] = None
+) -> AudioDecoder:
+    decoder_config = config.get_decoder_config()
+    backend = backend or decoder_config['backend']
+    sample_rate = sample_rate or decoder_config['sample_rate']
+    if backend not in DECODER_BACKENDS:
+        raise ValueError(f"Unknown audio decoder backend: {backend}")
+    if backend == SoundFileDecoder.name:
+        return SoundFileDecoder(sample_rate, resample_quality or decoder_config['resample_quality'])
+    return DECODER_BACKENDS[backend](sample_rate)
@@ -0,0 +1,211 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import get_config, get_logger
+from src.services.metrics import STAGE_SECONDS
+
+logger = get_logger("catalog_recommendation_service")
+config = get_config()
+
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_LIST = 64
+_ASSIGN_CHUNK = 65536
+
+
+class RecommendationCatalog:
+    """Artists and tracks with genre tags and unit-length embeddings in one contiguous float32 array.
+
+    With an IVF index the rows are ordered by coarse cluster, so every inverted list is a
+    contiguous slice and a query only scores the lists closest to it.
+    """
+
+    def __init__(self, names: List[str], genres: List[List[str]], embeddings: np.ndarray, ivf_lists: int = 0):
+        if len(names) != len(embeddings) or len(genres) != len(embeddings):
+            raise ValueError("Catalog names, genres and embeddings must have the same length")
+        if len(embeddings) == 0:
+            raise ValueError("Catalog is empty")
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        self._centroids: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        order = np.arange(len(embeddings))
+        if 0 < ivf_lists < len(embeddings):
+            order = self._build_ivf(embeddings, ivf_lists)
+
+        self.embeddings = np.ascontiguousarray(embeddings[order])
+        self.names = [names[index] for index in order]
+        self.genres = [[self._normalize(genre) for genre in genres[index]] for index in order]
+        self.genre_vectors = self._genre_vectors()
+
+    @classmethod
+    def load(cls, path: Path, ivf_lists: int = 0) -> "RecommendationCatalog":
+        if path.suffix == ".npz":
+            with np.load(path, allow_pickle=False) as data:
+                names = [str(name) for name in data["names"]]
+                genres = [[tag for tag in str(tags).split(",") if tag.strip()] for tags in data["genres"]]
+                embeddings = data["embeddings"]
+        elif path.suffix in (".jsonl", ".json"):
+            names, genres, vectors = [], [], []
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    names.append(item["name"])
+                    genres.append(item.get("genres") or [])
+                    vectors.append(item["embedding"])
+            embeddings = np.asarray(vectors, dtype=np.float32)
+        else:
+            raise ValueError(f"Unsupported catalog format: {path.suffix} (expected .npz or .jsonl)")
+        return cls(names, genres, embeddings, ivf_lists=ivf_lists)
+
+    @staticmethod
+    def _normalize(genre: str) -> str:
+        return genre.lower().strip().replace(" ", "-")
+
+    def _build_ivf(self, embeddings: np.ndarray, lists: int) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        sample = embeddings[rng.choice(len(embeddings), min(len(embeddings), lists * _KMEANS_SAMPLES_PER_LIST), replace=False)]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            filled = np.bincount(assignment, minlength=lists) > 0
+            centroids[filled] = sums[filled] / np.linalg.norm(sums[filled], axis=1, keepdims=True).clip(1e-12)
+
+        assignment = np.concatenate([
+            np.argmax(embeddings[start:start + _ASSIGN_CHUNK] @ centroids.T, axis=1)
+            for start in range(0, len(embeddings), _ASSIGN_CHUNK)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        self._centroids = np.ascontiguousarray(centroids)
+        self._list_offsets = np.searchsorted(assignment[order], np.arange(lists + 1))
+        return order
+
+    def _genre_vectors(self) -> Dict[str, np.ndarray]:
+        rows_by_genre: Dict[str, List[int]] = {}
+        for row, tags in enumerate(self.genres):
+            for genre in tags:
+                rows_by_genre.setdefault(genre, []).append(row)
+        vectors = {}
+        for genre, rows in rows_by_genre.items():
+            centroid = self.embeddings[rows].mean(axis=0)
+            vectors[genre] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+        return vectors
+
+    def search(self, query: np.ndarray, k: int, probes: int = 0) -> List[Tuple[int, float]]:
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape != (self.embeddings.shape[1],):
+            raise ValueError(f"Query has {query.size} dimensions, the catalog has {self.embeddings.shape[1]}")
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if self._centroids is None or probes <= 0:
+            rows = None
+            scores = self.embeddings @ query
+        else:
+            nearest_lists = np.argsort(self._centroids @ query)[::-1][:probes]
+            rows = np.concatenate([
+                np.arange(self._list_offsets[index], self._list_offsets[index + 1]) for index in nearest_lists
+            ])
+            scores = self.embeddings[rows] @ query
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[index] if rows is not None else index), float(scores[index])) for index in top]
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+
+class CatalogRecommendationService:
+    """Recommends catalog entries by embedding similarity instead of generating text with T5.
+
+    Exposes the same methods as DynamicRecommendationService, so either can back ClassificationService.
+    """
+
+    streams_tokens = False
+
+    def __init__(self, catalog_config: Optional[Dict[str, Any]] = None):
+        self._catalog_config: Dict[str, Any] = catalog_config or config.get_recommendation_catalog_config()
+        self.top_k: int = max(1, self._catalog_config['top_k'])
+        self.probes: int = self._catalog_config['ivf_probes']
+        self.catalog: Optional[RecommendationCatalog] = None
+        self._load_catalog()
+
+    def _load_catalog(self) -> None:
+        path = self._catalog_config['path']
+        if not path:
+            logger.error("RECOMMENDATION_CATALOG_PATH is not set")
+            return
+        try:
+            self.catalog = RecommendationCatalog.load(Path(path), ivf_lists=self._catalog_config['ivf_lists'])
+            logger.info(
+                "Loaded recommendation catalog with %d entries and %d genres",
+                len(self.catalog), len(self.catalog.genre_vectors)
+            )
+        except Exception as e:
+            logger.error(f"Failed to load recommendation catalog: {e}")
+            self.catalog = None
+
+    def generate_dynamic_recommendations(self, genre: str) -> List[str]:
+        if self.catalog is None:
+            return []
+        query = self.catalog.genre_vectors.get(RecommendationCatalog._normalize(genre))
+        if query is None:
+            logger.warning("No catalog entries are tagged with genre %s", genre)
+            return []
+        return self.recommend_for_embedding(query)
+
+    def recommend_for_embedding(self, embedding: np.ndarray, k: Optional[int] = None) -> List[str]:
+        """Nearest catalog entries to an embedding, e.g. one computed from audio with the catalog's encoder."""
+        if self.catalog is None:
+            return []
+        with STAGE_SECONDS.time(stage="catalog_search"):
+            matches = self.catalog.search(embedding, k or self.top_k, probes=self.probes)
+        return [self.catalog.names[row] for row, _ in matches]
+
+    def stream_dynamic_recommendations(self, genre: str) -> Iterator[str]:
+        yield from self.generate_dynamic_recommendations(genre)
+
+    def cached_recommendations(self, genre: str) -> List[str]:
+        # A catalog search is cheap enough to keep running when the service sheds model work.
+        return self.generate_dynamic_recommendations(genre)
+
+    def start_recommendation_pool(self, genres: Iterable[str]) -> None:
+        pass
+
+    def warm_up(self) -> None:
+        if self.catalog is not None and self.catalog.genre_vectors:
+            self.generate_dynamic_recommendations(next(iter(self.catalog.genre_vectors)))
+
+    def stop_recommendation_pool(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return {"enabled": False, "backend": "catalog"}
+
+    def is_available(self) -> bool:
+        return self.catalog is not None
+
+
+_catalog_recommendation_service: Optional[CatalogRecommendationService] = None
+
+
+def get_catalog_recommendation_service() -> CatalogRecommendationService:
+    global _catalog_recommendation_service
+    if _catalog_recommendation_service is None:
+        _catalog_recommendation_service = CatalogRecommendationService()
+    return _catalog_recommendation_service
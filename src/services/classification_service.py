@@ -1,42 +1,106 @@
+import contextvars
 import io
-from typing import Dict, Optional, Tuple, Any, cast
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Any, Union, cast
 
-import librosa
 import torch
 import numpy as np
-from transformers import pipeline, Pipeline
+import soundfile as sf
+from transformers import AutoConfig, AutoFeatureExtractor, AutoModelForAudioClassification, pipeline, Pipeline
 
 from src.config import get_config
-from src.services.dynamic_recommendation_service import get_dynamic_recommendation_service
-from src.schemas.response import AudioMetadata, ClassificationResponse
+from src.services.audio_decoder import create_audio_decoder
+from src.services.catalog_recommendation_service import CatalogRecommendationService, get_catalog_recommendation_service
+from src.services.classifier_batcher import ClassifierBatcher, ClassifierQueueFullError
+from src.services.model_precision import load_dtype, load_quantized_model, validate_precision
+from src.services.dynamic_recommendation_service import DynamicRecommendationService, get_dynamic_recommendation_service
+from src.services.fingerprint_index import FingerprintIndex
+from src.services.generation_batcher import GenerationQueueFullError
+from src.services.metrics import STAGE_SECONDS
+from src.services.overload_control import RequestAbortedError, get_overload_controller
+from src.services.request_profiler import get_request_profiler, instrument_pipeline, span
+from src.services.result_cache import CachedClassification, get_result_cache
+from src.services.thread_budget import get_thread_budget
+from src.schemas.request import AudioUpload
+from src.schemas.response import AudioMetadata, BatchClassificationItem, ClassificationResponse
 
 config = get_config()
 
+_EARLY_STOP_ROUND_SIZE = 2
+# Raised as they are rather than as a service error, so callers can tell back-pressure from a fault.
+_PASSTHROUGH_ERRORS = (RequestAbortedError, ClassifierQueueFullError, GenerationQueueFullError)
+
+RECOMMENDATION_BACKENDS = ("t5", "catalog")
+Recommender = Union[DynamicRecommendationService, CatalogRecommendationService]
+
+
+def load_recommenders() -> Dict[str, Recommender]:
+    """T5 is only loaded when it is the deployment's backend; a configured catalog is always loaded."""
+    catalog_config = config.get_recommendation_catalog_config()
+    recommenders: Dict[str, Recommender] = {}
+    if catalog_config['backend'] == "t5":
+        recommenders["t5"] = get_dynamic_recommendation_service()
+    if catalog_config['backend'] == "catalog" or catalog_config['path']:
+        recommenders["catalog"] = get_catalog_recommendation_service()
+    return recommenders
+
 
 class ModelManager:
-    def __init__(self):
+    def __init__(self, model_config: Optional[Dict[str, Any]] = None):
         self._genre_classifier: Optional[Pipeline] = None
-        self._model_config: Dict[str, Any] = config.get_audio_model_config()
+        self._model_config: Dict[str, Any] = model_config or config.get_audio_model_config()
         self._model_loaded = False
         self._load_model()
 
     def _load_model(self) -> None:
         try:
-            torch.set_num_threads(self._model_config['torch_num_threads'])
-            self._genre_classifier = pipeline(
-                "audio-classification",
-                model=self._model_config['model_name'],
-                device_map=self._model_config['device_map'],
-                model_kwargs={
-                    "cache_dir": self._model_config['cache_dir'],
-                    "dtype": torch.float32,
-                }
-            )
+            thread_budget = get_thread_budget()
+            if thread_budget.enabled:
+                thread_budget.apply_process()
+            else:
+                torch.set_num_threads(self._model_config['torch_num_threads'])
+            precision = validate_precision(self._model_config['precision'])
+            if precision == "int8":
+                self._genre_classifier = self._load_quantized_pipeline()
+            else:
+                self._genre_classifier = pipeline(
+                    "audio-classification",
+                    model=self._model_config['model_name'],
+                    device_map=self._model_config['device_map'],
+                    model_kwargs={
+                        "cache_dir": self._model_config['cache_dir'],
+                        "dtype": load_dtype(precision),
+                    }
+                )
+            instrument_pipeline(self._genre_classifier)
             self._model_loaded = True
         except Exception as e:
             self._model_loaded = False
             raise RuntimeError(f"Model initialization failed: {e}") from e
 
+    def _load_quantized_pipeline(self) -> Pipeline:
+        model_name = self._model_config['model_name']
+        cache_dir = self._model_config['cache_dir']
+        model = load_quantized_model(
+            model_name,
+            cache_dir,
+            load_fp32=lambda: AutoModelForAudioClassification.from_pretrained(
+                model_name, cache_dir=cache_dir, dtype=torch.float32
+            ),
+            build_empty=lambda: AutoModelForAudioClassification.from_config(
+                AutoConfig.from_pretrained(model_name, cache_dir=cache_dir)
+            )
+        )
+
+        # Dynamically quantized kernels only run on the CPU.
+        return pipeline(
+            "audio-classification",
+            model=model,
+            feature_extractor=AutoFeatureExtractor.from_pretrained(model_name, cache_dir=cache_dir),
+            device="cpu"
+        )
+
     def is_model_loaded(self) -> bool:
         return self._model_loaded and self._genre_classifier is not None
 
@@ -45,78 +109,281 @@ class ModelManager:
             raise RuntimeError("Classification model is not loaded")
         return cast(Pipeline, self._genre_classifier)
 
+    def get_labels(self) -> List[str]:
+        id2label = getattr(self.get_classifier().model.config, "id2label", None) or {}
+        return [str(label).lower().strip() for label in id2label.values()]
+
 
 class AudioProcessor:
     def __init__(self):
         self._file_config: Dict[str, Any] = config.get_file_config()
+        self._segment_config: Dict[str, Any] = config.get_segment_config()
         self.sample_rate = self._file_config['sample_rate']
+        self.decoder = create_audio_decoder(sample_rate=self.sample_rate)
 
-    def process_audio_file(self, file_bytes: bytes) -> Tuple[Dict[str, Any], AudioMetadata]:
-        if not file_bytes:
+    def process_audio_file(self, upload: AudioUpload) -> Tuple[Dict[str, Any], AudioMetadata]:
+        if not upload.size:
             raise ValueError("Empty audio file")
 
         try:
-            buffer = io.BytesIO(file_bytes)
-            waveform, _ = librosa.load(buffer, sr=self.sample_rate, mono=True, dtype=np.float32)
-
-            self._validate_audio_quality(waveform)
+            file = upload.open()
+            info = self.decoder.probe(file)
+            if info is not None:
+                self._validate_duration(info.duration)
+
+            if info is not None and self._decodes_segments_only():
+                segments = self._decode_segments(file, info.duration)
+                self._validate_audio_quality(np.concatenate(segments), check_duration=False)
+                duration = info.duration
+                audio_dict: Dict[str, Any] = {
+                    "segments": segments,
+                    "sampling_rate": self.sample_rate
+                }
+            else:
+                waveform = self.decoder.decode(file)
+                self._validate_audio_quality(waveform)
+                duration = len(waveform) / self.sample_rate
+                audio_dict = {
+                    "raw": waveform,
+                    "sampling_rate": self.sample_rate
+                }
 
             metadata = AudioMetadata(
-                duration=len(waveform) / self.sample_rate,
+                duration=duration,
                 sample_rate=self.sample_rate,
                 channels=1,
-                file_size=len(file_bytes),
-                format="mp3"
+                file_size=upload.size,
+                format=upload.format
             )
 
-            audio_dict = {
-                "raw": waveform,
-                "sampling_rate": self.sample_rate
-            }
-
             return audio_dict, metadata
 
         except Exception as e:
             raise ValueError(f"Unable to process audio file: {e}") from e
 
-    def _validate_audio_quality(self, waveform: np.ndarray) -> None:
+    def _decodes_segments_only(self) -> bool:
+        return self._segment_config['mode'] == "segments" and self._segment_config['selection'] == "even"
+
+    def _decode_segments(self, file: BinaryIO, duration: float) -> List[np.ndarray]:
+        window = self._segment_config['duration']
+        if duration <= window:
+            return [self.decoder.decode(file)]
+
+        count = max(1, self._segment_config['count'])
+        offsets = sorted(set(np.linspace(0, duration - window, num=count).round(3).tolist()))
+        return [self.decoder.decode(file, offset=offset, duration=window) for offset in offsets]
+
+    def select_segments(self, waveform: np.ndarray) -> List[np.ndarray]:
+        window = max(1, int(self._segment_config['duration'] * self.sample_rate))
+        count = max(1, self._segment_config['count'])
+        if len(waveform) <= window:
+            return [waveform]
+
+        if self._segment_config['selection'] == "energy":
+            starts = self._energy_ranked_starts(waveform, window, count)
+        else:
+            starts = np.linspace(0, len(waveform) - window, num=count).astype(int).tolist()
+
+        return [waveform[start:start + window] for start in sorted(set(starts))]
+
+    def _energy_ranked_starts(self, waveform: np.ndarray, window: int, count: int) -> List[int]:
+        hop = max(1, int(self._segment_config['hop'] * self.sample_rate))
+        candidates = np.arange(0, len(waveform) - window + 1, hop)
+        squared_sum = np.concatenate(([0.0], np.cumsum(waveform.astype(np.float64) ** 2)))
+        energies = squared_sum[candidates + window] - squared_sum[candidates]
+
+        selected: List[int] = []
+        for index in np.argsort(energies)[::-1]:
+            start = int(candidates[index])
+            if all(abs(start - other) >= window for other in selected):
+                selected.append(start)
+            if len(selected) == count:
+                break
+        return selected
+
+    def _validate_audio_quality(self, waveform: np.ndarray, check_duration: bool = True) -> None:
         if len(waveform) == 0:
             raise ValueError("Audio file contains no audio data")
 
-        duration = len(waveform) / self.sample_rate
+        if check_duration:
+            self._validate_duration(len(waveform) / self.sample_rate)
+
+    def _validate_duration(self, duration: float) -> None:
         max_duration = self._file_config['max_duration']
         if duration > max_duration:
             raise ValueError(f"Audio too long: {duration:.1f}s (max: {max_duration}s)")
 
 
 class ClassificationService:
-    def __init__(self):
-        self.model_manager = ModelManager()
+    def __init__(self, recommendations_enabled: bool = True):
+        self.model_manager = get_model_manager()
+        self.classifier_batcher = ClassifierBatcher(self.model_manager.get_classifier)
         self.audio_processor = AudioProcessor()
-        self.dynamic_recommendation_service = get_dynamic_recommendation_service()
-
-    def classify_with_recommendations(self, file_bytes: bytes) -> ClassificationResponse:
+        self._segment_config: Dict[str, Any] = config.get_segment_config()
+        self.recommenders: Dict[str, Recommender] = load_recommenders() if recommendations_enabled else {}
+        # The deployment's default backend; requests can pick another loaded one by name.
+        self.dynamic_recommendation_service: Optional[Recommender] = self.recommenders.get(
+            config.settings.recommendation_backend
+        )
+        self.result_cache = get_result_cache()
+        self.overload = get_overload_controller()
+        self.fingerprint_index = FingerprintIndex(namespace=self._cache_namespace())
+        self._batch_pool: Optional[ThreadPoolExecutor] = None
+        self._batch_pool_lock = threading.Lock()
+
+    def classify_with_recommendations(self, upload: AudioUpload, recommender: Optional[str] = None) -> ClassificationResponse:
         try:
-            audio_dict, _ = self.audio_processor.process_audio_file(file_bytes)
-            genre = self._classify_genre(audio_dict)
-
-            if self.dynamic_recommendation_service.is_available():
-                recommendations = self.dynamic_recommendation_service.generate_dynamic_recommendations(genre)
-            else:
-                recommendations = []
+            genre = self.classify_cached(upload).genre
+            recommendations = self.recommend(genre, recommender)
 
             return ClassificationResponse(
                 genre=genre,
                 recommendations=recommendations
             )
 
+        except _PASSTHROUGH_ERRORS:
+            raise
         except Exception as e:
             raise RuntimeError(f"Classification service error: {e}") from e
 
+    def classify_batch(self, uploads: List[AudioUpload], recommender: Optional[str] = None) -> List[BatchClassificationItem]:
+        # Each file is decoded on its own thread; their windows meet in the classifier
+        # batcher, so the forward passes are shared across files.
+        futures = [
+            self._get_batch_pool().submit(contextvars.copy_context().run, self.classify_cached, upload)
+            for upload in uploads
+        ]
+
+        items = []
+        for upload, future in zip(uploads, futures):
+            try:
+                items.append(BatchClassificationItem(filename=upload.filename, genre=future.result().genre))
+            except (ValueError, ClassifierQueueFullError) as e:
+                items.append(BatchClassificationItem(filename=upload.filename, error=str(e)))
+            except Exception:
+                items.append(BatchClassificationItem(filename=upload.filename, error="Classification failed"))
+
+        # A genre whose recommendations fail keeps its classification and reports the error.
+        recommendations_by_genre: Dict[str, Union[List[str], str]] = {}
+        for item in items:
+            if item.genre is None:
+                continue
+            if item.genre not in recommendations_by_genre:
+                try:
+                    recommendations_by_genre[item.genre] = self.recommend(item.genre, recommender)
+                except RequestAbortedError:
+                    raise
+                except (ValueError, GenerationQueueFullError) as e:
+                    recommendations_by_genre[item.genre] = f"Recommendations unavailable: {e}"
+                except Exception:
+                    recommendations_by_genre[item.genre] = "Recommendations unavailable"
+            recommendations = recommendations_by_genre[item.genre]
+            if isinstance(recommendations, str):
+                item.error = recommendations
+            else:
+                item.recommendations = recommendations
+        return items
+
+    def get_recommender(self, name: Optional[str] = None) -> Optional[Recommender]:
+        if name is None:
+            return self.dynamic_recommendation_service
+        if name not in RECOMMENDATION_BACKENDS:
+            raise ValueError(f"Unknown recommender: {name}. Options: {', '.join(RECOMMENDATION_BACKENDS)}")
+        recommender = self.recommenders.get(name)
+        if recommender is None or not recommender.is_available():
+            available = [key for key, value in self.recommenders.items() if value.is_available()]
+            raise ValueError(f"Recommender {name} is not enabled on this server. Available: {', '.join(available) or 'none'}")
+        return recommender
+
+    def recommend(self, genre: str, recommender: Optional[str] = None) -> List[str]:
+        backend = self.get_recommender(recommender)
+        if backend is None or not backend.is_available():
+            return []
+        with span("recommend", genre=genre) as recommend_span:
+            if self.overload.should_degrade():
+                self.overload.record_degraded()
+                if recommend_span is not None:
+                    recommend_span.attributes["degraded"] = True
+                return backend.cached_recommendations(genre)
+            return backend.generate_dynamic_recommendations(genre)
+
+    def _get_batch_pool(self) -> ThreadPoolExecutor:
+        with self._batch_pool_lock:
+            if self._batch_pool is None:
+                self._batch_pool = ThreadPoolExecutor(
+                    max_workers=max(1, config.get_file_config()['batch_decode_workers']),
+                    thread_name_prefix="batch-decode",
+                    initializer=get_thread_budget().apply_stage,
+                    initargs=("decode",)
+                )
+            return self._batch_pool
+
+    def classify_cached(self, upload: AudioUpload) -> CachedClassification:
+        if not self.result_cache.enabled:
+            return self._classify_file(upload)
+
+        key = self.result_cache.make_key(upload.sha256, namespace=self._cache_namespace())
+        return self.result_cache.get_or_compute(key, lambda: self._classify_file(upload))
+
+    def _classify_file(self, upload: AudioUpload) -> CachedClassification:
+        with STAGE_SECONDS.time(stage="decode"), span("decode", size=upload.size, format=upload.format), \
+                get_request_profiler().capture("decode"):
+            audio_dict, metadata = self.audio_processor.process_audio_file(upload)
+
+        fingerprint = None
+        if self.fingerprint_index.enabled:
+            with STAGE_SECONDS.time(stage="fingerprint"), span("fingerprint") as fingerprint_span:
+                fingerprint = self.fingerprint_index.fingerprint(audio_dict)
+                match = self.fingerprint_index.lookup(fingerprint) if fingerprint is not None else None
+                if fingerprint_span is not None:
+                    fingerprint_span.attributes["hit"] = match is not None
+            if match is not None:
+                return CachedClassification(genre=match.genre, metadata=metadata)
+
+        genre = self.classify_decoded(audio_dict)
+        if fingerprint is not None:
+            self.fingerprint_index.add(fingerprint, genre)
+        return CachedClassification(genre=genre, metadata=metadata)
+
+    def classify_decoded(self, audio_dict: Dict[str, Any]) -> str:
+        with span("classify"):
+            return self._classify_genre(audio_dict)
+
+    def start(self) -> None:
+        for recommender in self.recommenders.values():
+            recommender.start_recommendation_pool(self.model_manager.get_labels())
+
+    def warm_up(self) -> None:
+        sample_rate = self.audio_processor.sample_rate
+        samples = int(self._segment_config['duration'] * sample_rate)
+        noise = 0.01 * np.random.default_rng(0).standard_normal(samples).astype(np.float32)
+        buffer = io.BytesIO()
+        sf.write(buffer, noise, sample_rate, format="WAV")
+
+        audio_dict, _ = self.audio_processor.process_audio_file(AudioUpload.from_bytes(buffer.getvalue()))
+        self._classify_genre(audio_dict)
+        for recommender in self.recommenders.values():
+            recommender.warm_up()
+
+    def shutdown(self) -> None:
+        for recommender in self.recommenders.values():
+            recommender.shutdown()
+        self.classifier_batcher.shutdown()
+        if self._batch_pool is not None:
+            self._batch_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_namespace(self) -> str:
+        parts = [config.settings.audio_model_name, self._segment_config['mode']]
+        if self._segment_config['mode'] == "segments":
+            parts.extend(str(self._segment_config[key]) for key in sorted(self._segment_config) if key != "mode")
+        return "|".join(parts)
+
     def _classify_genre(self, audio_dict: Dict[str, Any]) -> str:
         try:
-            classifier = self.model_manager.get_classifier()
-            results = classifier(audio_dict)
+            if self._segment_config['mode'] == "segments":
+                return self._classify_segments(audio_dict)
+
+            results = self.classifier_batcher.classify(audio_dict)
 
             if not results:
                 raise RuntimeError("No classification results")
@@ -129,13 +396,69 @@ class ClassificationService:
 
             return genre
 
+        except _PASSTHROUGH_ERRORS:
+            raise
         except Exception as e:
             raise RuntimeError(f"Model inference error: {e}") from e
 
-
+    def _classify_segments(self, audio_dict: Dict[str, Any]) -> str:
+        segments = audio_dict.get("segments") or self.audio_processor.select_segments(audio_dict["raw"])
+        threshold = self._segment_config['early_stop_confidence']
+        round_size = _EARLY_STOP_ROUND_SIZE if threshold > 0 else len(segments)
+
+        segment_scores: List[Dict[str, float]] = []
+        genre = ""
+        for start in range(0, len(segments), round_size):
+            results = self.classifier_batcher.classify_many([
+                {"raw": segment, "sampling_rate": audio_dict["sampling_rate"]}
+                for segment in segments[start:start + round_size]
+            ])
+            segment_scores.extend(self._scores_from_results(result) for result in results)
+            genre, confidence = self._aggregate_scores(segment_scores)
+            if threshold > 0 and confidence >= threshold:
+                break
+
+        if not genre:
+            raise RuntimeError("No classification results")
+        return genre
+
+    @staticmethod
+    def _scores_from_results(results: List[Dict[str, Any]]) -> Dict[str, float]:
+        return {result["label"].lower().strip(): float(result["score"]) for result in results}
+
+    def _aggregate_scores(self, segment_scores: List[Dict[str, float]]) -> Tuple[str, float]:
+        labels = sorted({label for scores in segment_scores for label in scores})
+        if not labels:
+            return "", 0.0
+        probabilities = np.array([[scores.get(label, 0.0) for label in labels] for scores in segment_scores])
+
+        if self._segment_config['aggregation'] == "vote":
+            votes = np.bincount(probabilities.argmax(axis=1), minlength=len(labels))
+            # Ties are broken by the mean probability across segments.
+            ranking = votes + probabilities.mean(axis=0) / 2
+            best = int(ranking.argmax())
+            return labels[best], float(votes[best]) / len(segment_scores)
+
+        # The pipeline returns softmax scores; averaging their logs ranks labels
+        # exactly like averaging the logits.
+        mean_log_probs = np.log(np.clip(probabilities, 1e-9, 1.0)).mean(axis=0)
+        aggregated = np.exp(mean_log_probs - mean_log_probs.max())
+        aggregated /= aggregated.sum()
+        best = int(aggregated.argmax())
+        return labels[best], float(aggregated[best])
+
+
+_model_manager: Optional[ModelManager] = None
 _classification_service: Optional[ClassificationService] = None
 
 
+def get_model_manager() -> ModelManager:
+    global _model_manager
+    if _model_manager is None:
+        _model_manager = ModelManager()
+    return _model_manager
+
+
 def get_classification_service() -> ClassificationService:
     global _classification_service
     if _classification_service is None:
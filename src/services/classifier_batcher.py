@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from transformers import Pipeline
+
+from src.config import get_config, get_logger
+from src.services.metrics import QUEUE_WAIT_SECONDS, STAGE_SECONDS
+from src.services.overload_control import current_deadline, drop_if_done
+from src.services.request_profiler import collect_stage_timings, current_span, get_request_profiler, record_span
+from src.services.thread_budget import get_thread_budget
+
+logger = get_logger("classifier_batcher")
+config = get_config()
+
+# Waveforms inside one forward pass are padded to the longest one, so a bucket
+# only accepts clips up to this much longer than its shortest member.
+_BUCKET_LENGTH_RATIO = 1.25
+
+
+class ClassifierQueueFullError(RuntimeError):
+    pass
+
+
+class _BatchItem:
+    __slots__ = ("audio_dict", "length", "future", "enqueued_at", "span", "deadline")
+
+    def __init__(self, audio_dict: Dict[str, Any]):
+        self.audio_dict = audio_dict
+        self.length = len(audio_dict["raw"])
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.span = current_span()
+        self.deadline = current_deadline()
+
+
+class ClassifierBatcher:
+    def __init__(self, classifier_provider: Callable[[], Pipeline]):
+        self._classifier_provider = classifier_provider
+        self._batching_config: Dict[str, Any] = config.get_batching_config()
+        self.max_batch_size: int = max(1, self._batching_config['max_batch_size'])
+        self.max_wait: float = max(0.0, self._batching_config['max_wait_ms']) / 1000.0
+        self._queue: "queue.Queue[Optional[_BatchItem]]" = queue.Queue(
+            maxsize=max(1, self._batching_config['max_queue_size'])
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def classify(self, audio_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.submit(audio_dict).result()
+
+    def classify_many(self, audio_dicts: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        futures = [self.submit(audio_dict) for audio_dict in audio_dicts]
+        return [future.result() for future in futures]
+
+    def submit(self, audio_dict: Dict[str, Any]) -> Future:
+        self._ensure_started()
+        item = _BatchItem(audio_dict)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full as e:
+            raise ClassifierQueueFullError("Classifier batch queue is full") from e
+        return item.future
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="classifier-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        get_thread_budget().apply_stage("classifier")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stop = True
+                    break
+                batch.append(next_item)
+
+            self._process_batch(batch)
+            if stop:
+                return
+
+    def _process_batch(self, batch: List[_BatchItem]) -> None:
+        active = [
+            item for item in batch
+            if item.future.set_running_or_notify_cancel() and not drop_if_done(item.deadline, item.future)
+        ]
+        started_at = time.perf_counter()
+        for item in active:
+            QUEUE_WAIT_SECONDS.observe(started_at - item.enqueued_at, queue="classifier")
+
+        for bucket in self._bucket_by_length(active):
+            try:
+                classifier = self._classifier_provider()
+                inputs = [dict(item.audio_dict) for item in bucket]
+                traced = any(item.span is not None for item in bucket)
+                bucket_start = time.perf_counter()
+                with STAGE_SECONDS.time(stage="classifier_forward"), \
+                        get_request_profiler().capture("classifier", [item.span for item in bucket]), \
+                        (collect_stage_timings() if traced else nullcontext({})) as timings:
+                    results = classifier(
+                        inputs,
+                        batch_size=len(bucket),
+                        top_k=classifier.model.config.num_labels
+                    )
+                if traced:
+                    self._record_spans(bucket, bucket_start, timings)
+                if len(results) != len(bucket):
+                    raise RuntimeError(
+                        f"Classifier returned {len(results)} results for {len(bucket)} inputs"
+                    )
+                for item, result in zip(bucket, results):
+                    item.future.set_result(result)
+            except Exception as e:
+                logger.error("Batched classification failed: %s", e)
+                for item in bucket:
+                    item.future.set_exception(e)
+
+    @staticmethod
+    def _record_spans(bucket: List[_BatchItem], start: float, timings: Dict[str, float]) -> None:
+        end = time.perf_counter()
+        for item in bucket:
+            batch_span = record_span(
+                item.span, "classifier_batch", start, end,
+                batch_size=len(bucket),
+                queue_wait_ms=round((start - item.enqueued_at) * 1000, 3)
+            )
+            offset = start
+            for stage in ("feature_extraction", "forward"):
+                if stage in timings:
+                    record_span(batch_span, stage, offset, offset + timings[stage])
+                    offset += timings[stage]
+
+    def _bucket_by_length(self, items: List[_BatchItem]) -> List[List[_BatchItem]]:
+        buckets: List[List[_BatchItem]] = []
+        for item in sorted(items, key=lambda batch_item: batch_item.length):
+            if buckets and item.length <= buckets[-1][0].length * _BUCKET_LENGTH_RATIO:
+                buckets[-1].append(item)
+            else:
+                buckets.append([item])
+        return buckets
+
+    def shutdown(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=5)
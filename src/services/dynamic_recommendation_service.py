@@ -1,30 +1,86 @@
-from typing import List, Optional
-from transformers import T5Tokenizer, T5ForConditionalGeneration
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import torch
+import torch.nn.functional as F
+from transformers import (
+    StoppingCriteria,
+    StoppingCriteriaList,
+    T5Config,
+    T5Tokenizer,
+    T5ForConditionalGeneration,
+    TextIteratorStreamer
+)
+from transformers.modeling_outputs import BaseModelOutput
 
 from src.config import get_config, get_logger
+from src.services.generation_batcher import GenerationBatcher, GenerationQueueFullError
+from src.services.inference_executor import get_inference_executor
+from src.services.metrics import STAGE_SECONDS
+from src.services.model_precision import load_dtype, load_quantized_model, validate_precision
+from src.services.overload_control import RequestDeadline, current_deadline
+from src.services.recommendation_pool import RecommendationPool
+from src.services.request_profiler import get_request_profiler
+from src.services.thread_budget import get_thread_budget
 
 logger = get_logger("dynamic_recommendation_service")
 config = get_config()
 
+MAX_NEW_TOKENS = 200
+
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """Finishes the rows of a batch whose request has passed its deadline or lost its client."""
+
+    def __init__(self, deadlines: List[Optional[RequestDeadline]]):
+        self.deadlines = deadlines
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs: Any) -> torch.BoolTensor:
+        done = [deadline is not None and deadline.is_done() for deadline in self.deadlines]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
 
 class DynamicRecommendationService:
-    def __init__(self):
+    streams_tokens = True
+
+    def __init__(self, model_config: Optional[Dict[str, Any]] = None):
         self.tokenizer: Optional[T5Tokenizer] = None
         self.model: Optional[T5ForConditionalGeneration] = None
+        self._model_config: Dict[str, Any] = model_config or config.get_text_model_config()
+        self._encoded_prompts: Dict[str, Tuple[torch.Tensor, torch.Tensor]] = {}
+        self._encode_lock = threading.Lock()
         self._load_text_model()
+        self.generation_batcher = GenerationBatcher(self._generate_batch)
+        self.recommendation_pool = RecommendationPool(self._generate_live)
 
     def _load_text_model(self) -> None:
         try:
+            model_name = self._model_config['model_name']
+            cache_dir = self._model_config['cache_dir']
+            precision = validate_precision(self._model_config['precision'])
+
             self.tokenizer = T5Tokenizer.from_pretrained(
-                "google/flan-t5-large",
-                cache_dir=config.settings.model_cache_dir
+                model_name,
+                cache_dir=cache_dir
             )
 
-            self.model = T5ForConditionalGeneration.from_pretrained(
-                "google/flan-t5-large",
-                cache_dir=config.settings.model_cache_dir,
-                low_cpu_mem_usage=True
-            )
+            if precision == "int8":
+                self.model = load_quantized_model(
+                    model_name,
+                    cache_dir,
+                    load_fp32=lambda: T5ForConditionalGeneration.from_pretrained(
+                        model_name, cache_dir=cache_dir, low_cpu_mem_usage=True, dtype=torch.float32
+                    ),
+                    build_empty=lambda: T5ForConditionalGeneration(
+                        T5Config.from_pretrained(model_name, cache_dir=cache_dir)
+                    )
+                )
+            else:
+                self.model = T5ForConditionalGeneration.from_pretrained(
+                    model_name,
+                    cache_dir=cache_dir,
+                    low_cpu_mem_usage=True,
+                    dtype=load_dtype(precision)
+                )
 
         except Exception as e:
             logger.error(f"Failed to load T5 model: {e}")
@@ -35,34 +91,159 @@ class DynamicRecommendationService:
         if not self.tokenizer or not self.model:
             return []
 
-        try:
-            prompt = self._build_prompt(genre)
-            input_ids = self.tokenizer(prompt, return_tensors="pt").input_ids
+        pooled = self.recommendation_pool.take(genre)
+        if pooled is not None:
+            return pooled
 
-            pad_token_id = None
-            eos_token_id = None
+        return self._generate_live(genre)
 
-            if self.tokenizer is not None:
-                pad_token_id = getattr(self.tokenizer, 'pad_token_id', None)
-                eos_token_id = getattr(self.tokenizer, 'eos_token_id', None)
+    def stream_dynamic_recommendations(self, genre: str) -> Iterator[str]:
+        """Starts generation on an inference worker and returns its text as the decoder produces it.
 
-            outputs = self.model.generate(
-                input_ids,
-                max_new_tokens=200,
-                temperature=0.7,
-                do_sample=True,
-                num_return_sequences=1,
-                pad_token_id=pad_token_id,
-                eos_token_id=eos_token_id
-            )
+        Admission happens here rather than on first read, so a full executor or an overloaded
+        service raises before the caller has sent anything.
+        """
+        if not self.tokenizer or not self.model:
+            return iter(())
+
+        pooled = self.recommendation_pool.take(genre)
+        if pooled is not None:
+            return iter(pooled)
+
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            timeout=config.settings.inference_timeout,
+            skip_special_tokens=True
+        )
+        future = get_inference_executor().submit(
+            self._generate_streaming, self._build_prompt(genre), streamer, current_deadline()
+        )
+        # Work dropped before it starts never reaches generate, which is what ends the stream.
+        future.add_done_callback(
+            lambda done: streamer.end() if done.cancelled() or done.exception() is not None else None
+        )
+        return streamer
+
+    def cached_recommendations(self, genre: str) -> List[str]:
+        """Pooled recommendations only, for when there is no time to run the model."""
+        if not self.tokenizer or not self.model:
+            return []
+        return self.recommendation_pool.take(genre) or []
+
+    def start_recommendation_pool(self, genres: Iterable[str]) -> None:
+        if self.is_available():
+            self.recommendation_pool.start(genres)
+
+    def warm_up(self) -> None:
+        if not self.tokenizer or not self.model:
+            return
+        self._generate_batch([self._build_prompt("rock")], max_new_tokens=4)
 
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+    def stop_recommendation_pool(self) -> None:
+        self.recommendation_pool.stop()
+
+    def shutdown(self) -> None:
+        self.stop_recommendation_pool()
+        self.generation_batcher.shutdown()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return self.recommendation_pool.get_stats()
+
+    def _generate_live(self, genre: str) -> List[str]:
+        if not self.tokenizer or not self.model:
+            return []
+
+        try:
+            prompt = self._build_prompt(genre)
+            generated_text = self.generation_batcher.generate(prompt)
             return self._process_generated_text(generated_text, prompt)
 
+        except GenerationQueueFullError:
+            raise
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
             return []
 
+    def _generate_batch(self, prompts: List[str], deadlines: Optional[List[Optional[RequestDeadline]]] = None,
+                        max_new_tokens: int = MAX_NEW_TOKENS) -> List[str]:
+        with torch.inference_mode(), STAGE_SECONDS.time(stage="generate"):
+            outputs = self.model.generate(
+                **self._encoder_inputs(prompts),
+                **self._sampling_kwargs(max_new_tokens),
+                stopping_criteria=self._stopping_criteria(deadlines or [])
+            )
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def _generate_streaming(self, prompt: str, streamer: TextIteratorStreamer,
+                            deadline: Optional[RequestDeadline] = None) -> None:
+        # Runs on an inference worker, which goes back to its decode share afterwards.
+        get_thread_budget().apply_stage("generation")
+        try:
+            with torch.inference_mode(), STAGE_SECONDS.time(stage="generate"), \
+                    get_request_profiler().capture("generate"):
+                self.model.generate(
+                    **self._encoder_inputs([prompt]),
+                    **self._sampling_kwargs(MAX_NEW_TOKENS),
+                    stopping_criteria=self._stopping_criteria([deadline]),
+                    streamer=streamer
+                )
+        except Exception as e:
+            logger.error("Error streaming recommendations: %s", e)
+            streamer.end()
+        finally:
+            get_thread_budget().apply_stage("decode")
+
+    @staticmethod
+    def _stopping_criteria(deadlines: List[Optional[RequestDeadline]]) -> StoppingCriteriaList:
+        if not any(deadline is not None for deadline in deadlines):
+            return StoppingCriteriaList()
+        return StoppingCriteriaList([DeadlineStoppingCriteria(deadlines)])
+
+    def _encoder_inputs(self, prompts: List[str]) -> Dict[str, Any]:
+        encoded = [self._encode_prompt(prompt) for prompt in prompts]
+        # Prompts differ in length; padded encoder positions are masked out of cross-attention.
+        max_length = max(hidden.shape[0] for hidden, _ in encoded)
+        hidden_states = torch.stack([
+            F.pad(hidden, (0, 0, 0, max_length - hidden.shape[0])) for hidden, _ in encoded
+        ])
+        attention_mask = torch.stack([
+            F.pad(mask, (0, max_length - mask.shape[0])) for _, mask in encoded
+        ])
+        return {
+            "encoder_outputs": BaseModelOutput(last_hidden_state=hidden_states),
+            "attention_mask": attention_mask
+        }
+
+    def _sampling_kwargs(self, max_new_tokens: int) -> Dict[str, Any]:
+        return {
+            "max_new_tokens": max_new_tokens,
+            "temperature": 0.7,
+            "do_sample": True,
+            "num_return_sequences": 1,
+            "pad_token_id": getattr(self.tokenizer, 'pad_token_id', None),
+            "eos_token_id": getattr(self.tokenizer, 'eos_token_id', None)
+        }
+
+    def _encode_prompt(self, prompt: str) -> Tuple[torch.Tensor, torch.Tensor]:
+        # Prompts come from a small fixed set, so each one is tokenized and encoded only once.
+        encoded = self._encoded_prompts.get(prompt)
+        if encoded is not None:
+            return encoded
+
+        with self._encode_lock:
+            encoded = self._encoded_prompts.get(prompt)
+            if encoded is None:
+                inputs = self.tokenizer(prompt, return_tensors="pt")
+                with torch.inference_mode():
+                    hidden = self.model.get_encoder()(
+                        input_ids=inputs.input_ids,
+                        attention_mask=inputs.attention_mask
+                    ).last_hidden_state
+                encoded = (hidden[0], inputs.attention_mask[0])
+                self._encoded_prompts[prompt] = encoded
+        return encoded
+
     def _build_prompt(self, genre: str) -> str:
         prompts_by_genre = {
             "rock": "Please suggest 2-3 similar bands or songs in the rock genre in bullet points.",
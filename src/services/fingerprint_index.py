@@ -0,0 +1,252 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from filelock import FileLock
+
+from src.config import get_config, get_logger
+from src.services.metrics import CallbackMetric, get_metrics_registry
+
+logger = get_logger("fingerprint_index")
+config = get_config()
+
+# Haitsma-Kalker style sub-fingerprints: one 32-bit word per frame, each bit the sign of an
+# energy difference between adjacent bands and adjacent frames in 300-2000 Hz.
+FRAME_SIZE = 4096
+HOP_SIZE = 512
+BAND_COUNT = 33
+MIN_FREQUENCY = 300.0
+MAX_FREQUENCY = 2000.0
+
+_MIN_OVERLAP_FRAMES = 64
+# Words shared by this many positions (silence, steady tones) say nothing about the song.
+_MAX_POSTINGS = 64
+_MAX_CANDIDATES = 4
+_REBUILD_EVERY = 256
+_SILENT_WORDS = (0, 0xFFFFFFFF)
+# Frames this far below the track's loudest frame, or below the absolute floor, are treated as
+# silence: quiet intros of unrelated tracks look alike and must not count towards a match.
+_QUIET_RELATIVE_DB = -40.0
+_QUIET_FLOOR_DB = -60.0
+# Part of the disk file name, so files written with another fingerprint layout are not reused.
+_FORMAT_VERSION = 2
+
+
+class FingerprintMatch(NamedTuple):
+    genre: str
+    similarity: float
+    offset: int
+
+
+def compute_fingerprint(waveform: np.ndarray, sample_rate: int) -> Optional[np.ndarray]:
+    """One word per frame; frames next to a quiet frame get the word 0, which lookups skip."""
+    if len(waveform) < FRAME_SIZE + HOP_SIZE:
+        return None
+
+    frames = np.lib.stride_tricks.sliding_window_view(waveform.astype(np.float32), FRAME_SIZE)[::HOP_SIZE]
+    power = np.einsum("ij,ij->i", frames, frames) / FRAME_SIZE
+    quiet = power < max(float(power.max()) * 10 ** (_QUIET_RELATIVE_DB / 10), 10 ** (_QUIET_FLOOR_DB / 10))
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE).astype(np.float32), axis=1)) ** 2
+
+    edges = np.geomspace(MIN_FREQUENCY, min(MAX_FREQUENCY, sample_rate / 2), BAND_COUNT + 1)
+    bins = np.unique(np.round(edges * FRAME_SIZE / sample_rate).astype(int))
+    energies = np.add.reduceat(spectrum[:, bins[0]:bins[-1]], bins[:-1] - bins[0], axis=1)
+    if energies.shape[1] != BAND_COUNT:
+        raise ValueError(f"Sample rate {sample_rate} is too low for fingerprinting")
+
+    band_differences = energies[:, :-1] - energies[:, 1:]
+    bits = (band_differences[1:] - band_differences[:-1]) > 0
+    words = (bits.astype(np.uint64) << np.arange(32, dtype=np.uint64)).sum(axis=1).astype(np.uint32)
+    # Each word compares a frame with the next one, so either being quiet makes it meaningless.
+    words[quiet[:-1] | quiet[1:]] = 0
+    return words
+
+
+class FingerprintIndex:
+    """Finds near-duplicate audio by comparing sub-fingerprints of its first seconds.
+
+    Entries live in a fixed-size record array, optionally a memory-mapped file shared by
+    worker processes, and the oldest entry is replaced once it is full. Lookups go through an
+    inverted index from sub-fingerprint words to positions and confirm candidates by bit error rate.
+    """
+
+    def __init__(self, namespace: str = ""):
+        self._fingerprint_config: Dict[str, Any] = config.get_fingerprint_config()
+        self.enabled: bool = self._fingerprint_config['enabled']
+        self.seconds: float = self._fingerprint_config['seconds']
+        self.similarity_threshold: float = self._fingerprint_config['similarity_threshold']
+        self.max_entries: int = max(1, self._fingerprint_config['max_entries'])
+        self.sample_rate: int = config.get_file_config()['sample_rate']
+        self.frames_per_entry = max(1, int(self.seconds * self.sample_rate - FRAME_SIZE) // HOP_SIZE)
+        self._dtype = np.dtype([
+            ("added_at", "<f8"),
+            ("length", "<u4"),
+            ("genre", "<U32"),
+            ("frames", "<u4", (self.frames_per_entry,))
+        ])
+
+        self._lock = threading.Lock()
+        self._file_lock: Optional[FileLock] = None
+        self._records = self._open_records(namespace) if self.enabled else np.zeros(0, dtype=self._dtype)
+        self._index_values = np.zeros(0, dtype=np.uint32)
+        self._index_postings = np.zeros(0, dtype=np.int64)
+        self._pending: Dict[int, List[int]] = {}
+        self._pending_entries = 0
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "added": 0}
+        self._rebuild_index()
+        self._register_metrics()
+
+    def _open_records(self, namespace: str) -> np.ndarray:
+        if not self._fingerprint_config['disk_enabled']:
+            return np.zeros(self.max_entries, dtype=self._dtype)
+
+        disk_dir = Path(self._fingerprint_config['disk_dir'])
+        disk_dir.mkdir(parents=True, exist_ok=True)
+        key = hashlib.sha256(
+            f"{namespace}|{self.seconds}|{self.max_entries}|{_FORMAT_VERSION}".encode("utf-8")
+        ).hexdigest()[:16]
+        path = disk_dir / f"fingerprints-{key}.npy"
+        self._file_lock = FileLock(str(path) + ".lock")
+        with self._file_lock:
+            if path.exists():
+                try:
+                    records = np.lib.format.open_memmap(path, mode="r+")
+                    if records.dtype == self._dtype and records.shape == (self.max_entries,):
+                        return records
+                except Exception as e:
+                    logger.warning("Recreating unreadable fingerprint file %s: %s", path, e)
+            return np.lib.format.open_memmap(path, mode="w+", dtype=self._dtype, shape=(self.max_entries,))
+
+    def fingerprint(self, audio_dict: Dict[str, Any]) -> Optional[np.ndarray]:
+        waveform = audio_dict.get("raw")
+        if waveform is None:
+            # In segment mode the first window starts at the beginning of the file.
+            waveform = audio_dict["segments"][0]
+        fingerprint = compute_fingerprint(waveform[:int(self.seconds * self.sample_rate)], self.sample_rate)
+        if fingerprint is None:
+            return None
+        fingerprint = fingerprint[:self.frames_per_entry]
+        # Mostly silent audio has too little left to tell songs apart.
+        if np.count_nonzero(~np.isin(fingerprint, _SILENT_WORDS)) < _MIN_OVERLAP_FRAMES:
+            return None
+        return fingerprint
+
+    def lookup(self, fingerprint: np.ndarray) -> Optional[FingerprintMatch]:
+        with self._lock:
+            slots, offsets = self._candidate_alignments(fingerprint)
+            match = self._best_match(fingerprint, slots, offsets)
+            self._stats["hits" if match is not None else "misses"] += 1
+        return match
+
+    def add(self, fingerprint: np.ndarray, genre: str) -> None:
+        with self._lock:
+            if self._file_lock is not None:
+                with self._file_lock:
+                    slot = self._write_record(fingerprint, genre)
+            else:
+                slot = self._write_record(fingerprint, genre)
+            self._stats["added"] += 1
+
+            for position, word in enumerate(fingerprint.tolist()):
+                self._pending.setdefault(word, []).append(slot * self.frames_per_entry + position)
+            self._pending_entries += 1
+            if self._pending_entries >= _REBUILD_EVERY:
+                self._rebuild_index()
+
+    def _write_record(self, fingerprint: np.ndarray, genre: str) -> int:
+        # The oldest slot is replaced; empty slots have added_at 0. Other processes may have
+        # written to the shared file, so the choice is made from the records, not a counter.
+        slot = int(np.argmin(self._records["added_at"]))
+        frames = self._records["frames"][slot]
+        frames[:] = 0
+        frames[:len(fingerprint)] = fingerprint
+        self._records["length"][slot] = len(fingerprint)
+        self._records["genre"][slot] = genre[:32]
+        self._records["added_at"][slot] = time.time()
+        return slot
+
+    def _rebuild_index(self) -> None:
+        positions = np.arange(self.frames_per_entry)
+        mask = positions[None, :] < self._records["length"][:, None]
+        postings = (np.arange(len(self._records))[:, None] * self.frames_per_entry + positions[None, :])[mask]
+        values = self._records["frames"][mask]
+        order = np.argsort(values, kind="stable")
+        self._index_values = values[order]
+        self._index_postings = postings[order].astype(np.int64)
+        self._pending = {}
+        self._pending_entries = 0
+
+    def _candidate_alignments(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        left = np.searchsorted(self._index_values, query, side="left")
+        counts = np.searchsorted(self._index_values, query, side="right") - left
+        counts[(counts > _MAX_POSTINGS) | np.isin(query, _SILENT_WORDS)] = 0
+
+        total = int(counts.sum())
+        starts = np.repeat(left - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        postings = [self._index_postings[starts + np.arange(total)]]
+        query_positions = [np.repeat(np.arange(len(query)), counts)]
+        for position, word in enumerate(query.tolist()):
+            pending = self._pending.get(word)
+            if pending and word not in _SILENT_WORDS:
+                postings.append(np.asarray(pending, dtype=np.int64))
+                query_positions.append(np.full(len(pending), position))
+
+        postings_array = np.concatenate(postings)
+        if len(postings_array) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        # A stored fingerprint that starts later in the song than the query gets a negative offset.
+        slots = postings_array // self.frames_per_entry
+        offsets = postings_array % self.frames_per_entry - np.concatenate(query_positions)
+        keys, votes = np.unique(slots * 2 * self.frames_per_entry + offsets + self.frames_per_entry,
+                                return_counts=True)
+        best = keys[np.argsort(votes)[::-1][:_MAX_CANDIDATES]]
+        return best // (2 * self.frames_per_entry), best % (2 * self.frames_per_entry) - self.frames_per_entry
+
+    def _best_match(self, fingerprint: np.ndarray, slots: np.ndarray, offsets: np.ndarray) -> Optional[FingerprintMatch]:
+        best: Optional[FingerprintMatch] = None
+        for slot, offset in zip(slots.tolist(), offsets.tolist()):
+            stored = self._records["frames"][slot][:self._records["length"][slot]]
+            if offset >= 0:
+                stored, query = stored[offset:], fingerprint
+            else:
+                query = fingerprint[-offset:]
+            overlap = min(len(stored), len(query))
+            stored, query = stored[:overlap], query[:overlap]
+            # Only frames with sound on both sides are compared.
+            informative = ~(np.isin(stored, _SILENT_WORDS) | np.isin(query, _SILENT_WORDS))
+            compared = int(np.count_nonzero(informative))
+            if compared < _MIN_OVERLAP_FRAMES:
+                continue
+            bit_errors = np.bitwise_count(stored[informative] ^ query[informative]).sum()
+            similarity = 1.0 - float(bit_errors) / (32 * compared)
+            if similarity >= self.similarity_threshold and (best is None or similarity > best.similarity):
+                best = FingerprintMatch(genre=str(self._records["genre"][slot]), similarity=similarity, offset=offset)
+        return best
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = int(np.count_nonzero(self._records["length"]))
+        stats["enabled"] = self.enabled
+        stats["max_entries"] = self.max_entries
+        stats["similarity_threshold"] = self.similarity_threshold
+        stats["disk_enabled"] = self._file_lock is not None
+        return stats
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_fingerprint_lookups_total",
+            "Near-duplicate fingerprint lookups by outcome.",
+            "counter", ("result",),
+            lambda: {(name,): self._stats[name] for name in ("hits", "misses")}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_fingerprint_entries",
+            "Fingerprints currently stored.",
+            "gauge", (),
+            lambda: {(): int(np.count_nonzero(self._records["length"]))}
+        ))
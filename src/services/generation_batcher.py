@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import get_config, get_logger
+from src.services.metrics import QUEUE_WAIT_SECONDS
+from src.services.overload_control import RequestDeadline, current_deadline, drop_if_done
+from src.services.request_profiler import current_span, get_request_profiler, record_span
+from src.services.thread_budget import get_thread_budget
+
+logger = get_logger("generation_batcher")
+config = get_config()
+
+
+class GenerationQueueFullError(RuntimeError):
+    pass
+
+
+class _GenerationItem:
+    __slots__ = ("prompt", "future", "enqueued_at", "span", "deadline")
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.span = current_span()
+        self.deadline = current_deadline()
+
+
+class GenerationBatcher:
+    """Collects prompts from concurrent callers and runs them through one batched generate call."""
+
+    def __init__(self, generate_batch: Callable[[List[str], List[Optional[RequestDeadline]]], List[str]]):
+        self._generate_batch = generate_batch
+        self._generation_config: Dict[str, Any] = config.get_generation_batching_config()
+        self.max_batch_size: int = max(1, self._generation_config['max_batch_size'])
+        self.max_wait: float = max(0.0, self._generation_config['max_wait_ms']) / 1000.0
+        self._queue: "queue.Queue[Optional[_GenerationItem]]" = queue.Queue(
+            maxsize=max(1, self._generation_config['max_queue_size'])
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        return self.submit(prompt).result()
+
+    def submit(self, prompt: str) -> Future:
+        self._ensure_started()
+        item = _GenerationItem(prompt)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full as e:
+            raise GenerationQueueFullError("Generation batch queue is full") from e
+        return item.future
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="generation-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        get_thread_budget().apply_stage("generation")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stop = True
+                    break
+                batch.append(next_item)
+
+            self._process_batch(batch)
+            if stop:
+                return
+
+    def _process_batch(self, batch: List[_GenerationItem]) -> None:
+        active = [
+            item for item in batch
+            if item.future.set_running_or_notify_cancel() and not drop_if_done(item.deadline, item.future)
+        ]
+        if not active:
+            return
+        started_at = time.perf_counter()
+        for item in active:
+            QUEUE_WAIT_SECONDS.observe(started_at - item.enqueued_at, queue="generation")
+
+        try:
+            with get_request_profiler().capture("generate", [item.span for item in active]):
+                texts = self._generate_batch([item.prompt for item in active], [item.deadline for item in active])
+            finished_at = time.perf_counter()
+            for item in active:
+                record_span(
+                    item.span, "generate", started_at, finished_at,
+                    batch_size=len(active),
+                    queue_wait_ms=round((started_at - item.enqueued_at) * 1000, 3)
+                )
+            if len(texts) != len(active):
+                raise RuntimeError(f"Generation returned {len(texts)} texts for {len(active)} prompts")
+            for item, text in zip(active, texts):
+                # Rows whose request went away were cut short by generate's stopping criteria.
+                if not drop_if_done(item.deadline, item.future):
+                    item.future.set_result(text)
+        except Exception as e:
+            logger.error("Batched generation failed: %s", e)
+            for item in active:
+                item.future.set_exception(e)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=5)
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from src.config import get_config, get_logger
+from src.services.metrics import QUEUE_WAIT_SECONDS, CallbackMetric, get_metrics_registry
+from src.services.overload_control import current_deadline, get_overload_controller
+from src.services.request_profiler import span
+from src.services.thread_budget import get_thread_budget
+
+logger = get_logger("inference_executor")
+config = get_config()
+
+T = TypeVar("T")
+
+
+class InferenceQueueFullError(RuntimeError):
+    pass
+
+
+class InferenceTimeoutError(RuntimeError):
+    pass
+
+
+class InferenceExecutor:
+    def __init__(self):
+        self._executor_config: Dict[str, Any] = config.get_inference_config()
+        self.max_workers: int = max(1, self._executor_config['max_workers'])
+        self.max_queue_size: int = max(0, self._executor_config['max_queue_size'])
+        self.timeout: Optional[float] = self._executor_config['timeout'] or None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.overload = get_overload_controller()
+        self._register_metrics()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue_size
+
+    def submit(self, func: Callable[..., T], *args: Any) -> Future:
+        """Queues work without waiting for it; rejects it the same way `run` does."""
+        deadline = current_deadline()
+        self.overload.admit(deadline)
+        try:
+            self._acquire_slot()
+        except InferenceQueueFullError:
+            self.overload.record_shed("queue_full", deadline)
+            raise
+        try:
+            # The copied context carries the request's profiling span into the worker thread.
+            context = contextvars.copy_context()
+            future: Future = self._get_executor().submit(
+                context.run, self._timed, func, time.perf_counter(), *args
+            )
+        except Exception:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        deadline = current_deadline()
+        future = self.submit(func, *args)
+
+        effective_timeout = timeout if timeout is not None else self.timeout
+        waiter = asyncio.wrap_future(future)
+        if deadline is not None:
+            if effective_timeout is None or deadline.remaining() < effective_timeout:
+                effective_timeout = max(0.0, deadline.remaining())
+            # A disconnect stops the wait; work that has not started is then dropped.
+            loop = asyncio.get_running_loop()
+            deadline.add_callback(lambda: loop.call_soon_threadsafe(waiter.cancel))
+        try:
+            return await asyncio.wait_for(waiter, effective_timeout)
+        except asyncio.TimeoutError as e:
+            # Work that has not started yet is dropped; running work stops at its next
+            # deadline check or keeps its slot until it finishes.
+            future.cancel()
+            if deadline is not None and deadline.expired():
+                self.overload.record_aborted(deadline)
+                raise deadline.error() from e
+            raise InferenceTimeoutError(f"Inference did not finish within {effective_timeout:.1f}s") from e
+        except asyncio.CancelledError:
+            if deadline is None or not deadline.cancelled:
+                raise
+            future.cancel()
+            self.overload.record_aborted(deadline)
+            raise deadline.error() from None
+
+    def _timed(self, func: Callable[..., T], submitted_at: float, *args: Any) -> T:
+        queue_wait = time.perf_counter() - submitted_at
+        QUEUE_WAIT_SECONDS.observe(queue_wait, queue="inference")
+        self.overload.observe_queue_wait(queue_wait)
+        deadline = current_deadline()
+        if deadline is not None and deadline.is_done():
+            self.overload.record_aborted(deadline)
+            raise deadline.error()
+        with span("inference", queue_wait_ms=round(queue_wait * 1000, 3)):
+            return func(*args)
+
+    def _acquire_slot(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise InferenceQueueFullError("Inference queue is full")
+            self._in_flight += 1
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _on_done(self, _: Future) -> None:
+        self._release_slot()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference",
+                    initializer=get_thread_budget().apply_stage,
+                    initargs=("decode",)
+                )
+                logger.info(
+                    "Inference executor started: %d workers, queue size %d",
+                    self.max_workers, self.max_queue_size
+                )
+            return self._executor
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.max_queue_size,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers)
+        }
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_inference_in_flight",
+            "Requests holding an inference slot, running or waiting for a worker.",
+            "gauge", (), lambda: {(): self.get_stats()["in_flight"]}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_inference_queued",
+            "Requests waiting for an inference worker.",
+            "gauge", (), lambda: {(): self.get_stats()["queued"]}
+        ))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_inference_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = InferenceExecutor()
+    return _inference_executor
@@ -0,0 +1,344 @@
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import get_config, get_logger
+from src.schemas.request import AudioUpload
+from src.schemas.response import ClassificationResponse
+from src.services.inference_executor import InferenceQueueFullError, get_inference_executor
+from src.services.metrics import CallbackMetric, get_metrics_registry
+from src.services.overload_control import OverloadedError, get_overload_controller
+from src.services.thread_budget import get_thread_budget
+
+logger = get_logger("job_queue")
+config = get_config()
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_IDLE_POLL_INTERVAL = 1.0
+_PURGE_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    sha256 TEXT NOT NULL,
+    audio_format TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    upload_path TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+
+class JobQueue:
+    """Classification jobs persisted in SQLite so they survive restarts and can be shared by worker processes."""
+
+    def __init__(self):
+        self._queue_config: Dict[str, Any] = config.get_job_queue_config()
+        self.enabled: bool = self._queue_config['enabled']
+        self.workers: int = max(1, self._queue_config['workers'])
+        self.max_depth: int = self._queue_config['max_depth']
+        self.max_attempts: int = max(1, self._queue_config['max_attempts'])
+        self.lease_timeout: float = self._queue_config['lease_timeout']
+        self.retry_backoff: float = max(0.0, self._queue_config['retry_backoff'])
+        self.retention: float = self._queue_config['retention']
+        self.long_poll_max: float = self._queue_config['long_poll_max']
+        self._db_path = Path(self._queue_config['db_path'])
+        self._upload_dir = Path(self._queue_config['upload_dir'])
+
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._service: Any = None
+        self._executor = get_inference_executor()
+        self._overload = get_overload_controller()
+        if self.enabled:
+            self._register_metrics()
+
+    def submit(self, upload: AudioUpload) -> Dict[str, Any]:
+        if not self.enabled:
+            raise RuntimeError("Job queue is disabled")
+
+        self._ensure_initialized()
+        job_id = uuid.uuid4().hex
+        upload_path = self._upload_dir / job_id
+        with open(upload_path, "wb") as target:
+            shutil.copyfileobj(upload.open(), target)
+
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (JOB_QUEUED,)).fetchone()[0]
+                if depth >= self.max_depth:
+                    conn.execute("ROLLBACK")
+                    raise JobQueueFullError(f"Job queue is full ({depth} jobs waiting)")
+                conn.execute(
+                    "INSERT INTO jobs (id, status, filename, sha256, audio_format, mime_type, size, upload_path, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, JOB_QUEUED, upload.filename, upload.sha256, upload.format, upload.mime_type,
+                     upload.size, str(upload_path), time.time())
+                )
+                conn.execute("COMMIT")
+        except Exception:
+            upload_path.unlink(missing_ok=True)
+            raise
+
+        self._wake_event.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_initialized()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def start(self, service: Any) -> None:
+        if not self.enabled or self._threads:
+            return
+        self._ensure_initialized()
+        self._service = service
+        self._stop_event.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d job workers", self.workers)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+
+        self._ensure_initialized()
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS count, MIN(created_at) AS oldest FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {row["status"]: row["count"] for row in rows}
+        oldest = {row["status"]: row["oldest"] for row in rows}
+        return {
+            "enabled": True,
+            "depth": counts.get(JOB_QUEUED, 0),
+            "running": counts.get(JOB_RUNNING, 0),
+            "done": counts.get(JOB_DONE, 0),
+            "failed": counts.get(JOB_FAILED, 0),
+            "oldest_queued_age": round(now - oldest[JOB_QUEUED], 3) if JOB_QUEUED in oldest else 0.0,
+            "max_depth": self.max_depth,
+            "workers": len(self._threads)
+        }
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_job_queue_depth",
+            "Jobs waiting for a worker.",
+            "gauge", (), lambda: {(): self.get_stats()["depth"]}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_job_queue_oldest_age_seconds",
+            "Age of the oldest waiting job.",
+            "gauge", (), lambda: {(): self.get_stats()["oldest_queued_age"]}
+        ))
+
+    def _run(self) -> None:
+        get_thread_budget().apply_stage("decode")
+        last_purge = 0.0
+        while not self._stop_event.is_set():
+            if time.monotonic() - last_purge > _PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                self._purge_expired()
+
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error("Failed to claim a job: %s", e)
+                job = None
+
+            if job is None:
+                self._wake_event.wait(timeout=_IDLE_POLL_INTERVAL)
+                self._wake_event.clear()
+                continue
+            self._process(job)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Running jobs whose lease ran out belong to a worker that died or was restarted.
+            # A queued job with a lease is waiting out its retry backoff.
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND (lease_until IS NULL OR lease_until <= ?)) "
+                "OR (status = ? AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, now, JOB_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                    (JOB_FAILED, f"Job failed after {row['attempts']} attempts", now, row["id"])
+                )
+                conn.execute("COMMIT")
+                Path(row["upload_path"]).unlink(missing_ok=True)
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, lease_until = ? WHERE id = ?",
+                (JOB_RUNNING, now, now + self.lease_timeout, row["id"])
+            )
+            conn.execute("COMMIT")
+        return dict(row)
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        # Jobs share the inference executor with interactive requests but yield to them: while the
+        # service is degraded or the executor is full they wait instead of taking a slot.
+        if self._overload.should_degrade():
+            self._defer(job_id)
+            return
+        try:
+            with open(job["upload_path"], "rb") as file:
+                upload = AudioUpload(
+                    file=file,
+                    size=job["size"],
+                    sha256=job["sha256"],
+                    audio_format=job["audio_format"],
+                    mime_type=job["mime_type"],
+                    filename=job["filename"]
+                )
+                result = self._executor.submit(self._classify, upload).result(timeout=self._executor.timeout)
+        except (InferenceQueueFullError, OverloadedError):
+            self._defer(job_id)
+            return
+        except (ValueError, FileNotFoundError) as e:
+            self._finish(job, JOB_FAILED, error=str(e))
+            return
+        except Exception as e:
+            logger.error("Job %s failed on attempt %d: %s", job_id, job["attempts"] + 1, e)
+            if job["attempts"] + 1 < self.max_attempts:
+                self._requeue(job_id, self.retry_backoff * 2 ** job["attempts"])
+            else:
+                self._finish(job, JOB_FAILED, error="Classification failed")
+            return
+
+        self._finish(job, JOB_DONE, result=result.model_dump())
+
+    def _classify(self, upload: AudioUpload) -> ClassificationResponse:
+        # Not classify_with_recommendations: it wraps input errors in RuntimeError,
+        # and those must fail the job at once with their own message.
+        genre = self._service.classify_cached(upload).genre
+        return ClassificationResponse(genre=genre, recommendations=self._service.recommend(genre))
+
+    def _defer(self, job_id: str) -> None:
+        # Waiting for capacity is not a failed attempt.
+        self._requeue(job_id, self.retry_backoff, count_attempt=False)
+
+    def _finish(self, job: Dict[str, Any], status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job["id"])
+            )
+        Path(job["upload_path"]).unlink(missing_ok=True)
+
+    def _requeue(self, job_id: str, delay: float, count_attempt: bool = True) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_until = ?, attempts = attempts - ? WHERE id = ?",
+                (JOB_QUEUED, time.time() + delay if delay > 0 else None, 0 if count_attempt else 1, job_id)
+            )
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.retention
+        try:
+            with self._connect() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                    (JOB_DONE, JOB_FAILED, cutoff)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Failed to purge finished jobs: %s", e)
+            return
+        if deleted:
+            logger.info("Purged %d finished jobs", deleted)
+
+    def _ensure_initialized(self) -> None:
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._upload_dir.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+            self._initialized = True
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation; SQLite serializes writers across threads and processes.
+        conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"]
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,278 @@
+import io
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from src.config import get_config, get_logger
+from src.services.classifier_batcher import ClassifierBatcher
+from src.services.metrics import CallbackMetric, get_metrics_registry
+
+logger = get_logger("live_classifier")
+config = get_config()
+
+PCM_FORMATS: Dict[str, np.dtype] = {
+    "pcm_s16le": np.dtype("<i2"),
+    "pcm_f32le": np.dtype("<f4")
+}
+ENCODED_FORMAT = "encoded"
+INPUT_FORMATS = tuple(PCM_FORMATS) + (ENCODED_FORMAT,)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+MAX_CHANNELS = 8
+
+
+class LiveStreamLimitError(RuntimeError):
+    pass
+
+
+class RingBuffer:
+    """The latest `capacity` samples of a stream, kept in one preallocated array."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(max(1, capacity), dtype=np.float32)
+        self._position = 0
+        self.filled = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = samples[-self.capacity:]
+        end = self._position + len(samples)
+        if end <= self.capacity:
+            self._data[self._position:end] = samples
+        else:
+            split = self.capacity - self._position
+            self._data[self._position:] = samples[:split]
+            self._data[:end - self.capacity] = samples[split:]
+        self._position = end % self.capacity
+        self.filled = min(self.capacity, self.filled + len(samples))
+
+    def snapshot(self) -> np.ndarray:
+        """Oldest to newest. A copy, so the stream keeps writing while it is classified."""
+        if self.filled < self.capacity:
+            return self._data[:self.filled].copy()
+        return np.concatenate((self._data[self._position:], self._data[:self._position]))
+
+
+class GenreTracker:
+    """Smooths window scores over time and switches label only after a clear lead.
+
+    A rival label has to beat the current one by `switch_margin` in the smoothed scores for
+    `switch_windows` windows in a row, so a label does not flicker between close genres.
+    """
+
+    def __init__(self, smoothing: float, switch_margin: float, switch_windows: int):
+        self.smoothing = min(max(smoothing, 0.0), 1.0)
+        self.switch_margin = max(0.0, switch_margin)
+        self.switch_windows = max(1, switch_windows)
+        self.genre: Optional[str] = None
+        self._scores: Dict[str, float] = {}
+        self._challenger: Optional[str] = None
+        self._challenger_windows = 0
+
+    @property
+    def confidence(self) -> float:
+        return self._scores.get(self.genre, 0.0) if self.genre is not None else 0.0
+
+    def update(self, scores: Dict[str, float]) -> bool:
+        if not self._scores:
+            self._scores = dict(scores)
+        else:
+            self._scores = {
+                label: self.smoothing * self._scores.get(label, 0.0) + (1 - self.smoothing) * scores.get(label, 0.0)
+                for label in set(self._scores) | set(scores)
+            }
+
+        leader = max(self._scores, key=self._scores.__getitem__)
+        if self.genre is None:
+            self.genre = leader
+            return True
+        if leader == self.genre or self._scores[leader] - self._scores.get(self.genre, 0.0) < self.switch_margin:
+            self._challenger, self._challenger_windows = None, 0
+            return False
+
+        if leader != self._challenger:
+            self._challenger, self._challenger_windows = leader, 0
+        self._challenger_windows += 1
+        if self._challenger_windows < self.switch_windows:
+            return False
+        self.genre = leader
+        self._challenger, self._challenger_windows = None, 0
+        return True
+
+
+class LiveStream:
+    """One connection's audio: decoded and resampled chunk by chunk into a fixed-size window."""
+
+    def __init__(self, input_format: str, sample_rate: int, channels: int, live_config: Dict[str, Any]):
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"Unknown input format: {input_format}. Options: {', '.join(INPUT_FORMATS)}")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Sample rate must be between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE}")
+        if not 1 <= channels <= MAX_CHANNELS:
+            raise ValueError(f"Channels must be between 1 and {MAX_CHANNELS}")
+
+        self.input_format = input_format
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.target_rate: int = live_config['sample_rate']
+        self.resample_quality: str = live_config['resample_quality']
+        self.buffer = RingBuffer(int(live_config['window_seconds'] * self.target_rate))
+        self.hop_samples = max(1, int(live_config['hop_seconds'] * self.target_rate))
+        self.tracker = GenreTracker(
+            live_config['smoothing'], live_config['switch_margin'], live_config['switch_windows']
+        )
+        self._resampler: Optional[soxr.ResampleStream] = None
+        self._resampler_rate: Optional[int] = None
+        self._remainder = b""
+        self._since_window = 0
+        self.samples = 0
+        self.windows = 0
+        self.skipped = 0
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / self.target_rate
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "format": self.input_format,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "window_seconds": self.buffer.capacity / self.target_rate,
+            "hop_seconds": self.hop_samples / self.target_rate
+        }
+
+    def feed(self, chunk: bytes) -> None:
+        if self.input_format == ENCODED_FORMAT:
+            waveform, rate = self._decode(chunk)
+        else:
+            waveform, rate = self._parse_pcm(chunk), self.sample_rate
+        if len(waveform) == 0:
+            return
+
+        if rate != self.target_rate:
+            if self._resampler is None or self._resampler_rate != rate:
+                self._resampler = soxr.ResampleStream(
+                    rate, self.target_rate, 1, dtype="float32", quality=self.resample_quality
+                )
+                self._resampler_rate = rate
+            waveform = self._resampler.resample_chunk(waveform)
+        self.buffer.write(waveform)
+        self.samples += len(waveform)
+        self._since_window += len(waveform)
+
+    def _parse_pcm(self, chunk: bytes) -> np.ndarray:
+        # A frame can be split across messages; the partial tail waits for the next one.
+        dtype = PCM_FORMATS[self.input_format]
+        frame_size = dtype.itemsize * self.channels
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % frame_size
+        self._remainder = data[usable:]
+        frames = np.frombuffer(data, dtype=dtype, count=usable // dtype.itemsize).reshape(-1, self.channels)
+        waveform = frames.mean(axis=1, dtype=np.float32) if self.channels > 1 else frames[:, 0].astype(np.float32)
+        if dtype.kind == "i":
+            waveform /= 32768.0
+        return np.ascontiguousarray(waveform, dtype=np.float32)
+
+    @staticmethod
+    def _decode(chunk: bytes) -> Tuple[np.ndarray, int]:
+        try:
+            with sf.SoundFile(io.BytesIO(chunk)) as audio:
+                data = audio.read(dtype="float32", always_2d=True)
+                rate = audio.samplerate
+        except Exception as e:
+            raise ValueError(f"Unable to decode audio chunk: {e}") from e
+        return np.ascontiguousarray(data.mean(axis=1), dtype=np.float32), rate
+
+    def window_due(self) -> bool:
+        return self.buffer.filled == self.buffer.capacity and self._since_window >= self.hop_samples
+
+    def take_window(self) -> Dict[str, Any]:
+        # Hops that passed while the previous window was still being classified are dropped.
+        self.skipped += max(0, self._since_window // self.hop_samples - 1)
+        self._since_window = 0
+        self.windows += 1
+        return {"raw": self.buffer.snapshot(), "sampling_rate": self.target_rate}
+
+    def update(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        scores = {result["label"].lower().strip(): float(result["score"]) for result in results}
+        changed = self.tracker.update(scores)
+        return {
+            "type": "genre",
+            "genre": self.tracker.genre,
+            "confidence": round(self.tracker.confidence, 4),
+            "changed": changed,
+            "window_genre": max(scores, key=scores.__getitem__) if scores else None,
+            "stream_seconds": round(self.seconds, 3)
+        }
+
+
+class LiveClassifier:
+    """Admits live streams and sends their windows through the shared classifier batcher.
+
+    Each stream holds one window of audio and has at most one window in the classifier, so its
+    memory and CPU stay flat however long it runs.
+    """
+
+    def __init__(self):
+        self._live_config: Dict[str, Any] = config.get_live_config()
+        self.enabled: bool = self._live_config['enabled']
+        self.max_streams: int = max(1, self._live_config['max_streams'])
+        self.max_chunk_bytes: int = self._live_config['max_chunk_bytes']
+        self._lock = threading.Lock()
+        self._active = 0
+        self._stats: Dict[str, int] = {"streams": 0, "rejected": 0, "windows": 0, "skipped": 0}
+        self._register_metrics()
+
+    def open_stream(self, input_format: str, sample_rate: int, channels: int) -> LiveStream:
+        stream = LiveStream(input_format, sample_rate, channels, self._live_config)
+        with self._lock:
+            if self._active >= self.max_streams:
+                self._stats["rejected"] += 1
+                raise LiveStreamLimitError(f"Too many live streams (limit {self.max_streams})")
+            self._active += 1
+            self._stats["streams"] += 1
+        return stream
+
+    def close_stream(self, stream: LiveStream) -> None:
+        with self._lock:
+            self._active -= 1
+            self._stats["windows"] += stream.windows
+            self._stats["skipped"] += stream.skipped
+
+    @staticmethod
+    def submit(batcher: ClassifierBatcher, stream: LiveStream) -> Future:
+        return batcher.submit(stream.take_window())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["active"] = self._active
+        stats["enabled"] = self.enabled
+        stats["max_streams"] = self.max_streams
+        return stats
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_live_streams",
+            "Live classification streams currently open.",
+            "gauge", (), lambda: {(): self.get_stats()["active"]}
+        ))
+
+
+_live_classifier: Optional[LiveClassifier] = None
+
+
+def get_live_classifier() -> LiveClassifier:
+    global _live_classifier
+    if _live_classifier is None:
+        _live_classifier = LiveClassifier()
+    return _live_classifier
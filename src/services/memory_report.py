@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap")
+
+
+def read_process_memory(pid: int) -> Optional[Dict[str, int]]:
+    try:
+        lines = Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()
+    except OSError:
+        return None
+
+    usage: Dict[str, int] = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in _SMAPS_FIELDS:
+            usage[name.lower() + "_kb"] = int(value.split()[0])
+    usage["shared_kb"] = usage.get("shared_clean_kb", 0) + usage.get("shared_dirty_kb", 0)
+    usage["private_kb"] = usage.get("private_clean_kb", 0) + usage.get("private_dirty_kb", 0)
+    return usage
+
+
+def _child_pids(pid: int) -> List[int]:
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return []
+    return [int(child) for child in children]
+
+
+def get_memory_report() -> Dict[str, Any]:
+    """Memory of this process, plus the launcher and sibling workers when running pre-forked.
+
+    PSS splits shared pages between the processes mapping them, so the PSS total is the real
+    footprint of the whole group, while the RSS total counts shared weights once per worker.
+    """
+    pid = os.getpid()
+    parent_pid = os.getppid()
+    is_worker = os.environ.get("WORKER_INDEX") is not None
+    workers = _child_pids(parent_pid) if is_worker else [pid]
+
+    processes: Dict[str, Any] = {}
+    if is_worker:
+        processes[str(parent_pid)] = {"role": "launcher", **(read_process_memory(parent_pid) or {})}
+    for worker_pid in workers:
+        usage = read_process_memory(worker_pid)
+        if usage is not None:
+            processes[str(worker_pid)] = {"role": "worker", **usage}
+
+    return {
+        "pid": pid,
+        "worker_index": os.environ.get("WORKER_INDEX"),
+        "processes": processes,
+        "total_rss_kb": sum(process.get("rss_kb", 0) for process in processes.values()),
+        "total_pss_kb": sum(process.get("pss_kb", 0) for process in processes.values()),
+        "total_shared_kb": sum(process.get("shared_kb", 0) for process in processes.values()),
+        "total_private_kb": sum(process.get("private_kb", 0) for process in processes.values())
+    }
@@ -0,0 +1,98 @@
+import os
+import re
+from pathlib import Path
+from typing import Callable
+
+import torch
+import transformers
+from torch import nn
+from torch.ao.nn.quantized import dynamic as quantized_dynamic
+from torch.nn.utils import parametrize
+from transformers.modeling_utils import no_init_weights
+
+from src.config import get_logger
+
+logger = get_logger("model_precision")
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def validate_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown model precision: {precision} (expected one of {', '.join(PRECISIONS)})")
+    return precision
+
+
+def load_dtype(precision: str) -> torch.dtype:
+    # int8 models are loaded in fp32 and have their linear layers quantized afterwards.
+    return torch.bfloat16 if precision == "bf16" else torch.float32
+
+
+def quantized_cache_path(model_name: str, cache_dir: str) -> Path:
+    # The pickled module depends on the library versions that produced it.
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name.strip("/"))
+    versions = f"torch{torch.__version__}-transformers{transformers.__version__}"
+    return Path(cache_dir) / "quantized" / f"{safe_name}-int8-{versions}.pt"
+
+
+def load_quantized_model(
+    model_name: str,
+    cache_dir: str,
+    load_fp32: Callable[[], nn.Module],
+    build_empty: Callable[[], nn.Module]
+) -> nn.Module:
+    path = quantized_cache_path(model_name, cache_dir)
+    if path.exists():
+        try:
+            # The file is written by _save_quantized below, never taken from user input.
+            state_dict = torch.load(path, weights_only=False)
+            with no_init_weights():
+                model = build_empty()
+            model = _swap_linear_layers(fold_parametrizations(model.eval()))
+            model.load_state_dict(state_dict)
+            logger.info("Loaded int8 weights from %s", path)
+            return model
+        except Exception as e:
+            logger.warning("Ignoring unusable quantized weights %s: %s", path, e)
+
+    model = fold_parametrizations(load_fp32().eval())
+    quantized = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    _save_quantized(quantized, path)
+    return quantized
+
+
+def fold_parametrizations(model: nn.Module) -> nn.Module:
+    # Weight-norm and similar parametrizations are only needed for training; storing
+    # the resulting weight as a plain tensor keeps the state dict layout stable.
+    for module in model.modules():
+        if parametrize.is_parametrized(module):
+            for name in list(module.parametrizations.keys()):
+                parametrize.remove_parametrizations(module, name, leave_parametrized=True)
+    return model
+
+
+def _swap_linear_layers(model: nn.Module) -> nn.Module:
+    # Rebuilds the module layout produced by quantize_dynamic without quantizing anything,
+    # so the cached int8 weights can be loaded straight into it.
+    for module in list(model.modules()):
+        for child_name, child in list(module.named_children()):
+            if type(child) is nn.Linear:
+                setattr(module, child_name, quantized_dynamic.Linear(
+                    child.in_features,
+                    child.out_features,
+                    bias_=child.bias is not None,
+                    dtype=torch.qint8
+                ))
+    return model
+
+
+def _save_quantized(model: nn.Module, path: Path) -> None:
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(model.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+        logger.info("Saved int8 weights to %s", path)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        logger.warning("Failed to cache quantized weights %s: %s", path, e)
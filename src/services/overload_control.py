@@ -0,0 +1,254 @@
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import get_config, get_logger
+from src.services.metrics import CallbackMetric, get_metrics_registry
+
+logger = get_logger("overload_control")
+config = get_config()
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+LEVEL_NORMAL = "normal"
+LEVEL_DEGRADED = "degraded"
+LEVEL_SHEDDING = "shedding"
+SHED_REASONS = ("overload", "queue_full", "deadline", "disconnected")
+
+# Weight of each new queue wait in the moving average.
+_WAIT_SMOOTHING = 0.2
+
+_current_deadline: contextvars.ContextVar[Optional["RequestDeadline"]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+class RequestAbortedError(RuntimeError):
+    pass
+
+
+class DeadlineExceededError(RequestAbortedError):
+    pass
+
+
+class RequestCancelledError(RequestAbortedError):
+    pass
+
+
+class OverloadedError(RuntimeError):
+    pass
+
+
+class RequestDeadline:
+    """The point after which a request's result is no longer useful, or its client has gone."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.shed_reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def is_done(self) -> bool:
+        return self.cancelled or self.expired()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Runs the callback when the client disconnects, right away if it already has."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def error(self) -> RequestAbortedError:
+        if self.cancelled:
+            return RequestCancelledError("Client disconnected")
+        return DeadlineExceededError(f"Request deadline of {self.timeout:.1f}s exceeded")
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    return _current_deadline.get()
+
+
+def set_current_deadline(deadline: Optional[RequestDeadline]) -> contextvars.Token:
+    return _current_deadline.set(deadline)
+
+
+def reset_current_deadline(token: contextvars.Token) -> None:
+    _current_deadline.reset(token)
+
+
+class OverloadController:
+    """Turns sustained inference queue waits into a load level.
+
+    The wait is a moving average that also decays while nothing starts, so the level comes
+    back down once the queue drains even when shedding has stopped all new work.
+    """
+
+    def __init__(self):
+        self._overload_config: Dict[str, Any] = config.get_overload_config()
+        self.enabled: bool = self._overload_config['enabled']
+        self.default_deadline: float = self._overload_config['default_deadline']
+        self.max_deadline: float = self._overload_config['max_deadline']
+        self.degrade_wait: float = self._overload_config['degrade_wait']
+        self.shed_wait: float = self._overload_config['shed_wait']
+        self.window: float = max(0.1, self._overload_config['window'])
+        self._lock = threading.Lock()
+        self._wait = 0.0
+        self._observed_at = time.monotonic()
+        self._shed: Dict[str, int] = {reason: 0 for reason in SHED_REASONS}
+        self._degraded = 0
+        self._register_metrics()
+
+    def new_deadline(self, header_value: Optional[str]) -> Optional[RequestDeadline]:
+        timeout = self.default_deadline
+        if header_value:
+            try:
+                timeout = float(header_value) / 1000.0
+            except ValueError:
+                logger.warning("Ignoring invalid %s header: %r", DEADLINE_HEADER, header_value)
+        if timeout <= 0:
+            return None
+        return RequestDeadline(min(timeout, self.max_deadline) if self.max_deadline > 0 else timeout)
+
+    def observe_queue_wait(self, seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = self._decayed_wait(now)
+            self._wait = wait + _WAIT_SMOOTHING * (seconds - wait)
+            self._observed_at = now
+
+    def _decayed_wait(self, now: float) -> float:
+        return self._wait * math.exp(-max(0.0, now - self._observed_at) / self.window)
+
+    def expected_wait(self) -> float:
+        with self._lock:
+            return self._decayed_wait(time.monotonic())
+
+    def level(self) -> str:
+        if not self.enabled:
+            return LEVEL_NORMAL
+        wait = self.expected_wait()
+        if wait >= self.shed_wait:
+            return LEVEL_SHEDDING
+        if wait >= self.degrade_wait:
+            return LEVEL_DEGRADED
+        return LEVEL_NORMAL
+
+    def admit(self, deadline: Optional[RequestDeadline]) -> None:
+        """Rejects work that would only queue behind a backlog or could not finish before its deadline."""
+        if not self.enabled:
+            return
+        if self.level() == LEVEL_SHEDDING:
+            self.record_shed("overload", deadline)
+            raise OverloadedError("Service is overloaded")
+        if deadline is not None:
+            if deadline.is_done():
+                self.record_aborted(deadline)
+                raise deadline.error()
+            if deadline.remaining() < self.expected_wait():
+                self.record_shed("deadline", deadline)
+                raise DeadlineExceededError("Request deadline cannot be met at the current queue wait")
+
+    def should_degrade(self) -> bool:
+        return self.level() != LEVEL_NORMAL
+
+    def record_shed(self, reason: str, deadline: Optional[RequestDeadline] = None) -> None:
+        # A request dropped by a batcher is also seen failing by the executor; count it once.
+        with self._lock:
+            if deadline is not None:
+                if deadline.shed_reason is not None:
+                    return
+                deadline.shed_reason = reason
+            self._shed[reason] += 1
+
+    def record_aborted(self, deadline: RequestDeadline) -> None:
+        self.record_shed("disconnected" if deadline.cancelled else "deadline", deadline)
+
+    def record_degraded(self) -> None:
+        with self._lock:
+            self._degraded += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            shed = dict(self._shed)
+            degraded = self._degraded
+        return {
+            "enabled": self.enabled,
+            "level": self.level(),
+            "expected_queue_wait": round(self.expected_wait(), 4),
+            "degrade_wait": self.degrade_wait,
+            "shed_wait": self.shed_wait,
+            "default_deadline": self.default_deadline,
+            "shed": shed,
+            "shed_total": sum(shed.values()),
+            "degraded": degraded
+        }
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_requests_shed_total",
+            "Requests rejected or dropped before finishing, by reason.",
+            "counter", ("reason",),
+            lambda: {(reason,): count for reason, count in self.get_stats()["shed"].items()}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_requests_degraded_total",
+            "Requests answered with cached or empty recommendations because of load.",
+            "counter", (),
+            lambda: {(): self.get_stats()["degraded"]}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_overload_level",
+            "Load level: 0 normal, 1 degraded, 2 shedding.",
+            "gauge", (),
+            lambda: {(): (LEVEL_NORMAL, LEVEL_DEGRADED, LEVEL_SHEDDING).index(self.level())}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_inference_expected_wait_seconds",
+            "Moving average of the inference queue wait that drives the load level.",
+            "gauge", (),
+            lambda: {(): self.expected_wait()}
+        ))
+
+
+def drop_if_done(deadline: Optional[RequestDeadline], future: Future) -> bool:
+    """Fails a running future whose request has passed its deadline or lost its client."""
+    if deadline is None or not deadline.is_done():
+        return False
+    get_overload_controller().record_aborted(deadline)
+    future.set_exception(deadline.error())
+    return True
+
+
+_overload_controller: Optional[OverloadController] = None
+
+
+def get_overload_controller() -> OverloadController:
+    global _overload_controller
+    if _overload_controller is None:
+        _overload_controller = OverloadController()
+    return _overload_controller
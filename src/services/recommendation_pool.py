@@ -0,0 +1,202 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from src.config import get_config, get_logger
+
+logger = get_logger("recommendation_pool")
+config = get_config()
+
+_REFILL_INTERVAL = 60.0
+
+
+class _PoolEntry:
+    __slots__ = ("recommendations", "created_at", "uses")
+
+    def __init__(self, recommendations: List[str], created_at: float, uses: int = 0):
+        self.recommendations = recommendations
+        self.created_at = created_at
+        self.uses = uses
+
+
+class RecommendationPool:
+    def __init__(self, generator: Callable[[str], List[str]]):
+        self._generator = generator
+        self._pool_config: Dict[str, Any] = config.get_recommendation_pool_config()
+        self.enabled: bool = self._pool_config['enabled']
+        self.size: int = max(1, self._pool_config['size'])
+        self.ttl: float = self._pool_config['ttl']
+        self.max_uses: int = max(1, self._pool_config['max_uses'])
+        self.strategy: str = self._pool_config['strategy']
+        self._path = Path(self._pool_config['path'])
+        self._model_name = config.settings.text_model_name
+
+        self._pools: Dict[str, Deque[_PoolEntry]] = {}
+        self._lock = threading.Lock()
+        self._refill_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if self.enabled:
+            self._load()
+
+    def start(self, genres: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            for genre in genres:
+                self._pools.setdefault(self._normalize(genre), deque())
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="recommendation-pool",
+                    daemon=True
+                )
+                self._thread.start()
+        self._refill_event.set()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._refill_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        self._thread = None
+
+    def take(self, genre: str) -> Optional[List[str]]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            pool = self._pools.get(self._normalize(genre))
+            if pool is None:
+                return None
+            self._drop_expired(pool)
+            if not pool:
+                return None
+
+            if self.strategy == "round_robin":
+                entry = pool[0]
+                pool.rotate(-1)
+            else:
+                entry = pool[random.randrange(len(pool))]
+
+            entry.uses += 1
+            if entry.uses >= self.max_uses:
+                pool.remove(entry)
+            recommendations = list(entry.recommendations)
+
+        self._refill_event.set()
+        return recommendations
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = {genre: len(pool) for genre, pool in self._pools.items()}
+        return {
+            "enabled": self.enabled,
+            "target_size": self.size,
+            "strategy": self.strategy,
+            "pools": sizes
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._refill_event.wait(timeout=_REFILL_INTERVAL)
+            self._refill_event.clear()
+            if self._stop_event.is_set():
+                return
+
+            changed = False
+            for genre in self._genres_needing_refill():
+                changed = self._refill(genre) or changed
+                if self._stop_event.is_set():
+                    break
+            if changed:
+                self._save()
+
+    def _genres_needing_refill(self) -> List[str]:
+        with self._lock:
+            genres = []
+            for genre, pool in self._pools.items():
+                self._drop_expired(pool)
+                if len(pool) < self.size:
+                    genres.append(genre)
+            return genres
+
+    def _refill(self, genre: str) -> bool:
+        added = False
+        while not self._stop_event.is_set():
+            with self._lock:
+                if len(self._pools[genre]) >= self.size:
+                    break
+            try:
+                recommendations = self._generator(genre)
+            except Exception as e:
+                logger.error("Failed to pre-generate recommendations for %s: %s", genre, e)
+                break
+            if not recommendations:
+                break
+            with self._lock:
+                self._pools[genre].append(_PoolEntry(recommendations, time.time()))
+            added = True
+        return added
+
+    def _drop_expired(self, pool: Deque[_PoolEntry]) -> None:
+        now = time.time()
+        expired = [entry for entry in pool if entry.created_at + self.ttl < now]
+        for entry in expired:
+            pool.remove(entry)
+
+    def _load(self) -> None:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Ignoring unreadable recommendation pool file %s: %s", self._path, e)
+            return
+
+        if payload.get("model_name") != self._model_name:
+            return
+
+        for genre, entries in payload.get("pools", {}).items():
+            pool = self._pools.setdefault(genre, deque())
+            for entry in entries:
+                pool.append(_PoolEntry(entry["recommendations"], entry["created_at"], entry.get("uses", 0)))
+            self._drop_expired(pool)
+
+    def _save(self) -> None:
+        with self._lock:
+            payload = {
+                "model_name": self._model_name,
+                "pools": {
+                    genre: [
+                        {
+                            "recommendations": entry.recommendations,
+                            "created_at": entry.created_at,
+                            "uses": entry.uses
+                        }
+                        for entry in pool
+                    ]
+                    for genre, pool in self._pools.items()
+                }
+            }
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self._path)
+        except Exception as e:
+            logger.warning("Failed to persist recommendation pools: %s", e)
+
+    @staticmethod
+    def _normalize(genre: str) -> str:
+        return genre.lower().strip()
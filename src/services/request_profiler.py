@@ -0,0 +1,277 @@
+import contextvars
+import cProfile
+import functools
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.config import get_config, get_logger
+
+logger = get_logger("request_profiler")
+config = get_config()
+
+PROFILE_HEADER = "x-profile-token"
+CAPTURE_MODES = ("none", "cprofile", "torch")
+
+_NO_SPAN = nullcontext()
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("profiling_span", default=None)
+_stage_timings = threading.local()
+
+
+class Span:
+    __slots__ = ("name", "trace", "start", "end", "attributes", "children")
+
+    def __init__(self, name: str, trace: "Trace", start: Optional[float] = None):
+        self.name = name
+        self.trace = trace
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+        self.children: List["Span"] = []
+
+    def add_child(self, child: "Span") -> None:
+        with self.trace.lock:
+            self.children.append(child)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3)
+        }
+        if self.attributes:
+            data["attributes"] = dict(self.attributes)
+        with self.trace.lock:
+            children = list(self.children)
+        if children:
+            data["children"] = [child.to_dict(origin) for child in children]
+        return data
+
+
+class Trace:
+    def __init__(self, method: str, path: str, forced: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.created_at = time.time()
+        self.lock = threading.Lock()
+        self.files: List[str] = []
+        self.skipped_captures: List[str] = []
+        self.root = Span("request", self)
+
+    @property
+    def duration(self) -> float:
+        end = self.root.end if self.root.end is not None else time.perf_counter()
+        return end - self.root.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "forced": self.forced,
+            "files": list(self.files),
+            "capture_skipped": list(self.skipped_captures),
+            "spans": self.root.to_dict(self.root.start)
+        }
+
+
+class RequestProfiler:
+    """Builds per-request span trees for sampled or explicitly requested requests."""
+
+    def __init__(self):
+        self._profiling_config: Dict[str, Any] = config.get_profiling_config()
+        self.sample_rate: float = min(1.0, max(0.0, self._profiling_config['sample_rate']))
+        self.admin_token: str = self._profiling_config['admin_token']
+        self.capture_mode: str = self._profiling_config['capture']
+        if self.capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown profiling capture mode: {self.capture_mode}")
+        self.slow_threshold: float = self._profiling_config['slow_threshold_ms'] / 1000.0
+        self._trace_dir = Path(self._profiling_config['trace_dir'])
+        self._traces: Deque[Trace] = deque(maxlen=max(1, self._profiling_config['max_traces']))
+        self._lock = threading.Lock()
+        # Only one profiler can be active per interpreter; cProfile raises for a second one.
+        self._capture_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or bool(self.admin_token)
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        return bool(self.admin_token) and token == self.admin_token
+
+    def should_trace(self, token: Optional[str]) -> Optional[bool]:
+        """Returns None when the request is not traced, otherwise whether it was explicitly requested."""
+        if self.is_authorized(token):
+            return True
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return False
+        return None
+
+    def start_trace(self, method: str, path: str, forced: bool) -> Tuple[Trace, contextvars.Token]:
+        trace = Trace(method, path, forced)
+        return trace, _current_span.set(trace.root)
+
+    def finish_trace(self, trace: Trace, token: contextvars.Token) -> None:
+        _current_span.reset(token)
+        trace.root.end = time.perf_counter()
+        if trace.forced or trace.duration >= self.slow_threshold:
+            with self._lock:
+                self._traces.append(trace)
+
+    def get_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        traces.sort(key=lambda trace: trace.duration, reverse=True)
+        return [trace.to_dict() for trace in traces[:limit]]
+
+    @contextmanager
+    def capture(self, stage: str, spans: Optional[Sequence[Optional[Span]]] = None) -> Iterator[None]:
+        """Records a cProfile or torch profiler trace of one stage for the traced requests it serves.
+
+        Each stage is captured on the thread that runs it: decode on the inference worker, the
+        classifier forward and T5 generate on their batching threads, where `spans` are those of
+        the batch's requests. Captures do not overlap; a stage that starts during another capture
+        keeps its spans but is listed under `capture_skipped` instead of getting a file.
+        """
+        targets = [span for span in (spans if spans is not None else [_current_span.get()]) if span is not None]
+        if not targets or self.capture_mode == "none":
+            yield
+            return
+        if not self._capture_lock.acquire(blocking=False):
+            self._mark_skipped(targets, stage)
+            yield
+            return
+
+        try:
+            self._trace_dir.mkdir(parents=True, exist_ok=True)
+            if self.capture_mode == "cprofile":
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError as e:
+                    # Another tool, e.g. a debugger or coverage, already holds the profiling hook.
+                    logger.debug("Skipping cProfile capture: %s", e)
+                    self._mark_skipped(targets, stage)
+                    yield
+                    return
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                    self._save(targets, stage, lambda path: profile.dump_stats(path), ".prof")
+            else:
+                import torch.profiler
+
+                with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True) as prof:
+                    yield
+                self._save(targets, stage, lambda path: prof.export_chrome_trace(path), ".json")
+        finally:
+            self._capture_lock.release()
+
+    @staticmethod
+    def _mark_skipped(spans: List[Span], stage: str) -> None:
+        for trace in {id(span.trace): span.trace for span in spans}.values():
+            with trace.lock:
+                trace.skipped_captures.append(stage)
+
+    def _save(self, spans: List[Span], stage: str, write: Callable[[str], None], suffix: str) -> None:
+        # One file per batch; every traced request in it lists the file.
+        traces = list({id(span.trace): span.trace for span in spans}.values())
+        path = self._trace_dir / f"{traces[0].trace_id}-{len(traces[0].files)}-{stage}{suffix}"
+        try:
+            write(str(path))
+        except Exception as e:
+            logger.warning("Failed to write profile %s: %s", path, e)
+            return
+        for trace in traces:
+            with trace.lock:
+                trace.files.append(str(path))
+
+
+def span(name: str, **attributes: Any):
+    """Times a block as a child of the current span; does nothing when the request is not traced."""
+    parent = _current_span.get()
+    if parent is None:
+        return _NO_SPAN
+    return _span(parent, name, attributes)
+
+
+@contextmanager
+def _span(parent: Span, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    child = Span(name, parent.trace)
+    child.attributes.update(attributes)
+    parent.add_child(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def record_span(parent: Optional[Span], name: str, start: float, end: float, **attributes: Any) -> Optional[Span]:
+    """Attaches an already finished span, e.g. work done for this request on a batching thread."""
+    if parent is None:
+        return None
+    child = Span(name, parent.trace, start=start)
+    child.end = end
+    child.attributes.update(attributes)
+    parent.add_child(child)
+    return child
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    _stage_timings.current = timings
+    try:
+        yield timings
+    finally:
+        _stage_timings.current = None
+
+
+def timed_stage(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wraps a callable so its time is added to the timings collected on this thread, if any."""
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        timings = getattr(_stage_timings, "current", None)
+        if timings is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def instrument_pipeline(classifier: Any) -> Any:
+    # The pipeline calls these through the instance, so batched calls can report
+    # feature extraction and model forward time separately.
+    classifier.preprocess = timed_stage("feature_extraction", classifier.preprocess)
+    classifier._forward = timed_stage("forward", classifier._forward)
+    return classifier
+
+
+_request_profiler: Optional[RequestProfiler] = None
+
+
+def get_request_profiler() -> RequestProfiler:
+    global _request_profiler
+    if _request_profiler is None:
+        _request_profiler = RequestProfiler()
+    return _request_profiler
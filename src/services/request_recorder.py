@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from src.config import get_config, get_logger
+
+logger = get_logger("request_recorder")
+config = get_config()
+
+LOG_FILENAME = "requests.jsonl"
+_MAX_PENDING = 256
+
+
+class BodyWriter:
+    """Streams one request body to a temporary file next to the stored bodies, hashing it on the way."""
+
+    def __init__(self, directory: Path):
+        # Unique per process and request, since prefork workers share the directory.
+        self.temp_path = directory / f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        self._file: BinaryIO = open(self.temp_path, "wb")
+        self._digest = hashlib.sha256()
+        self.failed = False
+
+    def write(self, chunk: bytes) -> None:
+        if self.failed or not chunk:
+            return
+        try:
+            self._file.write(chunk)
+        except OSError as e:
+            # Recording must never fail the request itself.
+            logger.warning("Failed to write request body: %s", e)
+            self.failed = True
+            return
+        self._digest.update(chunk)
+
+    def close(self) -> Optional[str]:
+        """Returns the body's hash, or None when it could not be written completely."""
+        try:
+            self._file.close()
+        except OSError as e:
+            logger.warning("Failed to write request body: %s", e)
+            self.failed = True
+        if self.failed:
+            self.discard()
+            return None
+        return self._digest.hexdigest()
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+class RequestRecorder:
+    """Writes sampled requests to a JSONL log that benchmarks.load_generator can replay.
+
+    Request bodies are stored once per content hash next to the log, exactly as they were received,
+    so a replay sends the same multipart payload. Disk writes happen on a background thread.
+    """
+
+    def __init__(self):
+        self._log_config: Dict[str, Any] = config.get_request_log_config()
+        self.enabled: bool = self._log_config['enabled']
+        self.sample_rate: float = min(1.0, max(0.0, self._log_config['sample_rate']))
+        self.paths = frozenset(self._log_config['paths'])
+        self.directory: Optional[Path] = Path(self._log_config['directory']) if self.enabled else None
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], BodyWriter, str]]]" = queue.Queue(maxsize=_MAX_PENDING)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def open_body(self) -> Optional[BodyWriter]:
+        self._ensure_started()
+        try:
+            return BodyWriter(self.directory / "bodies")
+        except OSError as e:
+            logger.warning("Failed to record request: %s", e)
+            return None
+
+    def record(self, entry: Dict[str, Any], body: BodyWriter) -> None:
+        digest = body.close()
+        if digest is None:
+            return
+        try:
+            self._queue.put_nowait((entry, body, digest))
+        except queue.Full:
+            body.discard()
+            with self._lock:
+                self.dropped += 1
+            logger.warning("Request log writer is behind; dropped a request (%d so far)", self.dropped)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                (self.directory / "bodies").mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="request-recorder", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        with open(self.directory / LOG_FILENAME, "a", encoding="utf-8") as log_file:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                entry, body, digest = item
+                try:
+                    entry["body"] = self._save_body(body, digest)
+                    log_file.write(json.dumps(entry) + "\n")
+                    log_file.flush()
+                except OSError as e:
+                    body.discard()
+                    logger.warning("Failed to record request: %s", e)
+
+    def _save_body(self, body: BodyWriter, digest: str) -> str:
+        path = self.directory / "bodies" / f"{digest}.bin"
+        if path.exists():
+            body.discard()
+        else:
+            body.temp_path.replace(path)
+        return str(path.relative_to(self.directory))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+
+_request_recorder: Optional[RequestRecorder] = None
+
+
+def get_request_recorder() -> RequestRecorder:
+    global _request_recorder
+    if _request_recorder is None:
+        _request_recorder = RequestRecorder()
+    return _request_recorder
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.config import get_config, get_logger
+from src.schemas.response import AudioMetadata
+from src.services.metrics import CallbackMetric, get_metrics_registry
+from src.services.overload_control import (
+    DeadlineExceededError,
+    RequestAbortedError,
+    current_deadline,
+    get_overload_controller
+)
+
+logger = get_logger("result_cache")
+config = get_config()
+
+# How often a waiting follower checks whether its own request has been cancelled.
+_FOLLOWER_POLL_INTERVAL = 0.1
+
+
+class CachedClassification(BaseModel):
+    genre: str
+    metadata: AudioMetadata
+
+
+class _InFlightCall:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[CachedClassification] = None
+        self.error: Optional[BaseException] = None
+
+
+class ClassificationResultCache:
+    def __init__(self):
+        self._cache_config: Dict[str, Any] = config.get_result_cache_config()
+        self.enabled: bool = self._cache_config['enabled']
+        self.max_entries: int = max(1, self._cache_config['max_entries'])
+        self.ttl: float = self._cache_config['ttl']
+        self._disk_dir: Optional[Path] = None
+        if self._cache_config['disk_enabled']:
+            self._disk_dir = Path(self._cache_config['disk_dir'])
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[float, CachedClassification]]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "coalesced": 0
+        }
+        self._register_metrics()
+
+    @staticmethod
+    def make_key(content_hash: str, namespace: str = "") -> str:
+        digest = hashlib.sha256()
+        digest.update(namespace.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content_hash.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedClassification]:
+        with self._lock:
+            entry = self._get_from_memory(key)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry
+
+        entry = self._get_from_disk(key)
+        with self._lock:
+            if entry is not None:
+                self._stats["disk_hits"] += 1
+                self._put_in_memory(key, entry)
+            else:
+                self._stats["misses"] += 1
+        return entry
+
+    def put(self, key: str, entry: CachedClassification) -> None:
+        with self._lock:
+            self._put_in_memory(key, entry)
+        self._put_on_disk(key, entry)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], CachedClassification]
+    ) -> CachedClassification:
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._get_from_memory(key)
+            if entry is not None:
+                return entry
+            call = self._in_flight.get(key)
+            is_leader = call is None
+            if call is None:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+            else:
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            self._wait_for_leader(call)
+            if isinstance(call.error, RequestAbortedError):
+                # The leader's client went away; that says nothing about this request.
+                return self.get_or_compute(key, compute)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = compute()
+            self.put(key, call.result)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.event.set()
+
+    @staticmethod
+    def _wait_for_leader(call: _InFlightCall) -> None:
+        """Waits for the leader, but no longer than this request's own deadline or the inference timeout."""
+        deadline = current_deadline()
+        timeout = config.settings.inference_timeout
+        give_up_at = time.monotonic() + timeout if timeout > 0 else None
+        while True:
+            wait = _FOLLOWER_POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline.remaining()))
+            if give_up_at is not None:
+                wait = min(wait, max(0.0, give_up_at - time.monotonic()))
+            if call.event.wait(wait):
+                return
+            if deadline is not None and deadline.is_done():
+                get_overload_controller().record_aborted(deadline)
+                raise deadline.error()
+            if give_up_at is not None and time.monotonic() >= give_up_at:
+                raise DeadlineExceededError(f"Identical request in progress did not finish within {timeout:.1f}s")
+
+    def _get_from_memory(self, key: str) -> Optional[CachedClassification]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.time():
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put_in_memory(self, key: str, entry: CachedClassification) -> None:
+        self._entries[key] = (time.time() + self.ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def _disk_path(disk_dir: Path, key: str) -> Path:
+        return disk_dir / key[:2] / f"{key}.json"
+
+    def _get_from_disk(self, key: str) -> Optional[CachedClassification]:
+        if self._disk_dir is None:
+            return None
+        path = self._disk_path(self._disk_dir, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload["created_at"] + self.ttl < time.time():
+                path.unlink(missing_ok=True)
+                with self._lock:
+                    self._stats["expirations"] += 1
+                return None
+            return CachedClassification.model_validate(payload["entry"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Discarding unreadable cache file %s: %s", path, e)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _put_on_disk(self, key: str, entry: CachedClassification) -> None:
+        if self._disk_dir is None:
+            return
+        path = self._disk_path(self._disk_dir, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "entry": entry.model_dump()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Failed to write cache file %s: %s", path, e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["in_flight"] = len(self._in_flight)
+        stats["enabled"] = self.enabled
+        stats["max_entries"] = self.max_entries
+        stats["disk_enabled"] = self._disk_dir is not None
+        return stats
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        registry.register(CallbackMetric(
+            "music_genre_result_cache_lookups_total",
+            "Result cache lookups by outcome.",
+            "counter", ("result",),
+            lambda: {(name,): self._stats[name] for name in ("hits", "disk_hits", "misses", "coalesced")}
+        ))
+        registry.register(CallbackMetric(
+            "music_genre_result_cache_entries",
+            "Classification results held in memory.",
+            "gauge", (), lambda: {(): len(self._entries)}
+        ))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_result_cache: Optional[ClassificationResultCache] = None
+
+
+def get_result_cache() -> ClassificationResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ClassificationResultCache()
+    return _result_cache
@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.config import get_config, get_logger
+from src.services.catalog_recommendation_service import get_catalog_recommendation_service
+from src.services.classification_service import (
+    RECOMMENDATION_BACKENDS,
+    ClassificationService,
+    get_classification_service,
+    get_model_manager
+)
+from src.services.dynamic_recommendation_service import get_dynamic_recommendation_service
+from src.services.job_queue import get_job_queue
+
+logger = get_logger("service_loader")
+config = get_config()
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+STATE_SKIPPED = "skipped"
+
+
+class ServiceLoader:
+    """Loads the models off the request path and reports their state to the health probes."""
+
+    def __init__(self):
+        self.warmup_enabled: bool = config.settings.model_warmup_enabled
+        self._steps: Dict[str, Dict[str, Any]] = {
+            name: {"state": STATE_PENDING, "seconds": None, "error": None}
+            for name in ("audio_model", "text_model", "catalog", "warmup", "start", "job_queue")
+        }
+        self._finished = False
+        self._loaded_service: Optional[ClassificationService] = None
+        self._service: Optional[ClassificationService] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._service is not None:
+                return
+            self._thread = threading.Thread(target=self._load_and_activate, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def load(self) -> Optional[ClassificationService]:
+        """Loads the model weights without starting any background threads.
+
+        The pre-fork launcher calls this in the parent process so that workers inherit the weights.
+        """
+        if self._loaded_service is not None:
+            return self._loaded_service
+
+        if not self._run_step("audio_model", get_model_manager):
+            return None
+
+        catalog_config = config.get_recommendation_catalog_config()
+        if catalog_config['backend'] not in RECOMMENDATION_BACKENDS:
+            logger.error("Unknown recommendation backend %s, recommendations are disabled", catalog_config['backend'])
+        if catalog_config['backend'] == "t5":
+            self._run_step("text_model", self._load_text_model)
+        else:
+            self._set_step("text_model", STATE_SKIPPED)
+        if catalog_config['backend'] == "catalog" or catalog_config['path']:
+            self._run_step("catalog", self._load_catalog)
+        else:
+            self._set_step("catalog", STATE_SKIPPED)
+
+        self._loaded_service = get_classification_service()
+        return self._loaded_service
+
+    def _load_and_activate(self) -> None:
+        try:
+            service = self.load()
+            if service is None:
+                return
+
+            if self.warmup_enabled:
+                self._run_step("warmup", service.warm_up)
+            else:
+                self._set_step("warmup", STATE_SKIPPED)
+            if not self._run_step("start", service.start):
+                return
+
+            with self._lock:
+                self._service = service
+            # The synchronous API works without job workers, so a failure here is reported but not fatal.
+            self._run_step("job_queue", lambda: get_job_queue().start(service))
+            logger.info("Classification service is ready")
+        except Exception as e:
+            logger.error("Model loading failed: %s", e)
+        finally:
+            with self._lock:
+                self._finished = True
+
+    def is_ready(self) -> bool:
+        return self._service is not None
+
+    def has_failed(self) -> bool:
+        """True once the service can no longer become ready."""
+        with self._lock:
+            if self._service is not None:
+                return False
+            # Other steps can fail without blocking readiness; the loader only stops without a
+            # service when something it needed failed.
+            return self._finished or self._steps["audio_model"]["state"] == STATE_FAILED
+
+    def get_service(self) -> Optional[ClassificationService]:
+        return self._service
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = {name: dict(step) for name, step in self._steps.items()}
+        return {
+            "ready": self.is_ready(),
+            "failed": self.has_failed(),
+            "models": {name: steps[name] for name in ("audio_model", "text_model", "catalog")},
+            "warmup": steps["warmup"],
+            "start": steps["start"],
+            "job_queue": steps["job_queue"]
+        }
+
+    @staticmethod
+    def _load_text_model() -> None:
+        if not get_dynamic_recommendation_service().is_available():
+            raise RuntimeError("Text model unavailable, recommendations are disabled")
+
+    @staticmethod
+    def _load_catalog() -> None:
+        if not get_catalog_recommendation_service().is_available():
+            raise RuntimeError("Recommendation catalog unavailable, catalog recommendations are disabled")
+
+    def _run_step(self, name: str, func: Callable[[], Any]) -> bool:
+        self._set_step(name, STATE_LOADING)
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            logger.error("Loading step %s failed: %s", name, e)
+            self._set_step(name, STATE_FAILED, time.perf_counter() - start, str(e))
+            return False
+        self._set_step(name, STATE_READY, time.perf_counter() - start)
+        logger.info("Loading step %s finished in %.1fs", name, time.perf_counter() - start)
+        return True
+
+    def _set_step(self, name: str, state: str, seconds: Optional[float] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._steps[name] = {
+                "state": state,
+                "seconds": round(seconds, 3) if seconds is not None else None,
+                "error": error
+            }
+
+
+_service_loader: Optional[ServiceLoader] = None
+
+
+def get_service_loader() -> ServiceLoader:
+    global _service_loader
+    if _service_loader is None:
+        _service_loader = ServiceLoader()
+    return _service_loader
@@ -0,0 +1,183 @@
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+from threadpoolctl import threadpool_limits
+
+from src.config import get_config, get_logger
+
+logger = get_logger("thread_budget")
+config = get_config()
+
+STAGES = ("classifier", "generation", "decode")
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _read_cgroup_quota() -> Optional[float]:
+    """CPU quota of this process's cgroup in cores, or None when it is unlimited or unknown."""
+    try:
+        lines = Path("/proc/self/cgroup").read_text().splitlines()
+    except OSError:
+        return None
+
+    quotas = []
+    for line in lines:
+        _, controllers, path = line.split(":", 2)
+        relative = path.lstrip("/")
+        if controllers == "":
+            # cgroup v2: "max 100000" or "<quota> <period>", limits also apply from every ancestor.
+            directory = _CGROUP_ROOT / relative
+            while True:
+                quota = _parse_quota(directory / "cpu.max")
+                if quota is not None:
+                    quotas.append(quota)
+                if directory == _CGROUP_ROOT or directory == directory.parent:
+                    break
+                directory = directory.parent
+        elif "cpu" in controllers.split(","):
+            # cgroup v1; inside a container the cgroup path is usually the mount itself.
+            for mount in (_CGROUP_ROOT / "cpu", _CGROUP_ROOT / "cpu,cpuacct"):
+                for directory in (mount / relative, mount):
+                    quota = _parse_quota(directory / "cpu.cfs_quota_us", directory / "cpu.cfs_period_us")
+                    if quota is not None:
+                        quotas.append(quota)
+                        break
+    return min(quotas) if quotas else None
+
+
+def _parse_quota(path: Path, period_path: Optional[Path] = None) -> Optional[float]:
+    try:
+        fields = path.read_text().split()
+        if period_path is not None:
+            fields.append(period_path.read_text().strip())
+    except OSError:
+        return None
+    if len(fields) != 2 or fields[0] in ("max", "-1"):
+        return None
+    try:
+        quota, period = float(fields[0]), float(fields[1])
+    except ValueError:
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def detect_cpu_limit() -> Tuple[float, str]:
+    if hasattr(os, "sched_getaffinity"):
+        cpus, source = float(len(os.sched_getaffinity(0))), "affinity"
+    else:
+        cpus, source = float(os.cpu_count() or 1), "cpu_count"
+    quota = _read_cgroup_quota()
+    if quota is not None and quota < cpus:
+        return quota, "cgroup"
+    return cpus, source
+
+
+class ThreadBudget:
+    """Splits the CPUs this process may use between the pipeline stages.
+
+    torch's intra-op thread count sticks to the thread that sets it, so each stage's long-lived
+    threads apply their own share when they start. BLAS limits are process-wide and sized for
+    decode, where several worker threads call into numpy at once.
+    """
+
+    def __init__(self):
+        self._budget_config: Dict[str, Any] = config.get_thread_budget_config()
+        self.enabled: bool = self._budget_config['enabled']
+        self.plan: Dict[str, Any] = self._make_plan()
+        self._applied = False
+        self._lock = threading.Lock()
+
+    def _make_plan(self) -> Dict[str, Any]:
+        if self._budget_config['cpus'] > 0:
+            cpus, source = float(self._budget_config['cpus']), "configured"
+        else:
+            cpus, source = detect_cpu_limit()
+        processes = self._budget_config['processes']
+        process_cpus = self._budget_config['process_threads'] or max(1, math.floor(cpus / processes))
+
+        generation_enabled = self._budget_config['generation_enabled']
+        generation = self._budget_config['generation_threads'] or (max(1, process_cpus // 2) if generation_enabled else 0)
+        classifier = self._budget_config['classifier_threads'] or max(1, process_cpus - generation)
+        decode = self._budget_config['decode_threads'] or 1
+        interop = self._budget_config['interop_threads'] or 1
+        decode_workers = self._budget_config['decode_workers']
+
+        return {
+            "cpus": round(cpus, 2),
+            "source": source,
+            "processes": processes,
+            "process_cpus": process_cpus,
+            "classifier_threads": classifier,
+            "generation_threads": generation,
+            "decode_threads": decode,
+            "decode_workers": decode_workers,
+            "interop_threads": interop,
+            "peak_threads": classifier + generation + decode * decode_workers
+        }
+
+    def stage_threads(self, stage: str) -> int:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown thread budget stage: {stage}. Options: {', '.join(STAGES)}")
+        return max(1, self.plan[f"{stage}_threads"])
+
+    def apply_process(self) -> None:
+        """Sets the process-wide limits; called once per process before the models run."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._applied:
+                return
+            self._applied = True
+
+        try:
+            torch.set_num_interop_threads(self.plan['interop_threads'])
+        except RuntimeError as e:
+            # Only possible before the first inter-op work, e.g. not again after a fork.
+            logger.debug("Keeping %d inter-op threads: %s", torch.get_num_interop_threads(), e)
+        threadpool_limits(limits=self.plan['decode_threads'], user_api="blas")
+        self.apply_stage("classifier")
+        self.log_report()
+
+    def apply_stage(self, stage: str) -> None:
+        """Sets torch's intra-op threads for the calling thread."""
+        if not self.enabled:
+            return
+        # The first call in a thread resets it to the process default, so it has to come first.
+        torch.get_num_threads()
+        torch.set_num_threads(self.stage_threads(stage))
+
+    def log_report(self) -> None:
+        plan = self.plan
+        if self._budget_config['torch_num_threads'] is not None:
+            logger.warning(
+                "TORCH_NUM_THREADS=%d is ignored while the thread budget is enabled; set THREAD_BUDGET_ENABLED=false to use it",
+                self._budget_config['torch_num_threads']
+            )
+        logger.info(
+            "Thread budget: %.2f CPUs (%s), %d process(es) with %d each; classifier %d intra-op, "
+            "generation %d intra-op, decode %d BLAS x %d workers, %d inter-op",
+            plan['cpus'], plan['source'], plan['processes'], plan['process_cpus'], plan['classifier_threads'],
+            plan['generation_threads'], plan['decode_threads'], plan['decode_workers'], plan['interop_threads']
+        )
+        if plan['classifier_threads'] + plan['generation_threads'] > plan['process_cpus']:
+            logger.warning(
+                "Classifier and generation threads (%d) exceed the %d CPUs per process; they will compete for cores",
+                plan['classifier_threads'] + plan['generation_threads'], plan['process_cpus']
+            )
+
+    def get_report(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self.plan}
+
+
+_thread_budget: Optional[ThreadBudget] = None
+
+
+def get_thread_budget() -> ThreadBudget:
+    global _thread_budget
+    if _thread_budget is None:
+        _thread_budget = ThreadBudget()
+    return _thread_budget